@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Инкрементальная обработка альбома скриншотов.
+- Каждый скриншот проходит свою цепочку: скачивание → проверка на дубль → OCR
+- Скриншоты с характеристиками получают слот OCR первыми
+- В режиме OCR_MODE=fields OCR отдаёт и пары таблицы характеристик,
+  парсер берёт основные поля из них
+- Тексты соседних скриншотов склеиваются без повтора перекрытия (text_stitch)
+- Скриншот, который не удалось распознать, учитывается отдельно (failed);
+  при переполненной очереди OCR он ждёт и пробует снова
+- После каждого распознанного скриншота текст парсится заново,
+  прогресс отдаётся наружу (бот обновляет статус в чате)
+- Как только найдены все основные поля, карточку можно показывать;
+  остальные скриншоты дорабатывают в фоне и дополняют спецификацию
+"""
+
+from __future__ import annotations
+
+import heapq
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from PIL import Image
+
+import ocr_service
+from parser import CarDescriptionParser
+from parse_memo import parse_memo
+from ocr_executor import OCRQueueFull, ocr_executor, ocr_image_async, ocr_fields_async
+from image_dedup import DuplicateDetector
+from text_stitch import stitch_texts
+
+logger = logging.getLogger(__name__)
+
+# Очередь OCR переполнена (другие пользователи): скриншот ждёт и пробует снова
+OCR_BUSY_RETRIES = 3
+OCR_BUSY_DELAY = 2.0  # сек, растёт с каждой попыткой
+
+# Поля карточки, после которых OCR остальных скриншотов не ждём
+REQUIRED_FIELDS = ('title', 'year', 'engine_short', 'gearbox', 'drive', 'color', 'mileage_km')
+
+
+def missing_fields(parsed: Dict) -> List[str]:
+    """Основные поля, которые ещё не найдены"""
+    return [name for name in REQUIRED_FIELDS if parsed.get(name) is None]
+
+
+def screen_priority(image_path: str) -> float:
+    """
+    Насколько скриншот похож на экран характеристик (0..1).
+    Экран характеристик — ровный фон с текстом, экран с фото — много полутонов.
+    """
+    with Image.open(image_path) as img:
+        img.draft("L", (img.width // 8, img.height // 8))
+        thumb = img.convert("L").resize((64, 128), Image.Resampling.BOX)
+    pixels = list(thumb.getdata())
+    background = sorted(pixels)[len(pixels) // 2]
+    return sum(1 for p in pixels if abs(p - background) < 20) / len(pixels)
+
+
+class _PriorityGate:
+    """Семафор, который при освобождении слота пропускает ожидающего с наибольшим приоритетом"""
+
+    def __init__(self, slots: int):
+        self._free = max(1, slots)
+        self._waiters: list = []
+        self._seq = 0
+
+    async def acquire(self, priority: float) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, self._seq, fut))
+        self._seq += 1
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # Слот уже передан, но задача отменена — отдаём его следующему
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
+
+
+@dataclass
+class AlbumProgress:
+    """Состояние после очередного обработанного скриншота"""
+    index: int                    # номер скриншота в альбоме (0-based)
+    done: int                     # сколько скриншотов обработано
+    total: int
+    parsed: Dict
+    missing: List[str] = field(default_factory=list)
+    skipped: int = 0              # сколько пропущено как дубли
+    failed: int = 0               # сколько не удалось распознать
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+class AlbumPipeline:
+    """
+    OCR альбома с разбором после каждого скриншота.
+    sources — пути к файлам или идентификаторы для download(index, source) → путь.
+    ocr(path) → текст или {"text", "pairs"} (по умолчанию — по OCR_MODE).
+    """
+
+    def __init__(
+        self,
+        sources: List,
+        download: Optional[Callable[[int, object], Awaitable[str]]] = None,
+        ocr: Optional[Callable] = None,
+        parser: Optional[CarDescriptionParser] = None,
+        dedup: bool = True,
+    ):
+        self.sources = list(sources)
+        self.paths: List[Optional[str]] = [None] * len(self.sources)
+        self.texts: List[Optional[str]] = [None] * len(self.sources)
+        self.pairs: List[list] = [[] for _ in self.sources]
+        self.parsed: Dict = {}
+        self.skipped = 0
+        self.failed: Dict[int, str] = {}  # номер скриншота → "busy" (очередь OCR полна) или "error"
+        self._download = download
+        if ocr is None:
+            ocr = ocr_fields_async if ocr_service.OCR_MODE == "fields" else ocr_image_async
+        self._ocr = ocr
+        self._parser = parser or parse_memo
+        self._dedup = DuplicateDetector() if dedup else None
+        self._gate = _PriorityGate(ocr_executor.workers)
+        self._tasks: List[asyncio.Task] = []
+
+    async def _process_one(self, index: int) -> int:
+        n = len(self.sources)
+        text = ""
+        try:
+            source = self.sources[index]
+            path = await self._download(index, source) if self._download else source
+            self.paths[index] = path
+
+            if self._dedup is not None and await asyncio.to_thread(self._dedup.check, path):
+                self.skipped += 1
+                return index
+
+            try:
+                priority = await asyncio.to_thread(screen_priority, path)
+            except Exception as e:
+                logger.warning(f"Screen priority failed for photo {index+1}: {e}")
+                priority = 0.0
+
+            # Слот OCR: при очереди первыми идут экраны характеристик
+            await self._gate.acquire(priority)
+            try:
+                result = await self._ocr_retrying(index, path)
+            finally:
+                self._gate.release()
+            if isinstance(result, dict):
+                text = result["text"]
+                self.pairs[index] = result["pairs"]
+            else:
+                text = result
+            logger.info(f"OCR photo {index+1}/{n}: {len(text)} chars")
+        except asyncio.CancelledError:
+            # Отмену, которую никто не запрашивал (снятая пулом задача OCR), считаем
+            # ошибкой этого скриншота, а не остановкой всего альбома
+            if asyncio.current_task().cancelling():
+                raise
+            logger.error(f"Error on photo {index+1}/{n}: OCR job cancelled")
+            self.failed[index] = "error"
+        except OCRQueueFull as e:
+            logger.warning(f"Photo {index+1}/{n} dropped: {e}")
+            self.failed[index] = "busy"
+        except Exception as e:
+            logger.error(f"Error on photo {index+1}/{n}: {e!r}")
+            self.failed[index] = "error"
+        finally:
+            self.texts[index] = text
+        return index
+
+    async def _ocr_retrying(self, index: int, path: str):
+        """OCR; при переполненной очереди — до OCR_BUSY_RETRIES повторов с паузой"""
+        for attempt in range(OCR_BUSY_RETRIES + 1):
+            try:
+                return await self._ocr(path)
+            except OCRQueueFull:
+                if attempt == OCR_BUSY_RETRIES:
+                    raise
+                logger.info(f"OCR queue full, photo {index+1} retries in {OCR_BUSY_DELAY * (attempt + 1):.0f}s")
+                await asyncio.sleep(OCR_BUSY_DELAY * (attempt + 1))
+
+    def _start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._process_one(i)) for i in range(len(self.sources))]
+
+    def combined_text(self) -> str:
+        """
+        Текст распознанных скриншотов в порядке альбома; строки, повторённые
+        соседними скриншотами при прокрутке, остаются один раз
+        """
+        return stitch_texts([t for t in self.texts if t])
+
+    def _parse(self) -> Dict:
+        text = self.combined_text()
+        pairs = [pair for screen_pairs in self.pairs for pair in screen_pairs]
+        if pairs:
+            return self._parser.parse_fields({"text": text, "pairs": pairs})
+        return self._parser.parse(text)
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for t in self._tasks if not t.done())
+
+    @property
+    def processed(self) -> int:
+        """Распознано скриншотов (без дублей и без неудачных)"""
+        return sum(1 for t in self.texts if t is not None) - self.skipped - len(self.failed)
+
+    async def run(self) -> AsyncIterator[AlbumProgress]:
+        """Прогресс после каждого обработанного скриншота (в порядке готовности)"""
+        self._start()
+        done = 0
+        for next_done in asyncio.as_completed(self._tasks):
+            index = await next_done
+            done += 1
+            if self.texts[index]:
+                self.parsed = self._parse()
+            yield AlbumProgress(
+                index=index,
+                done=done,
+                total=len(self.sources),
+                parsed=self.parsed,
+                missing=missing_fields(self.parsed),
+                skipped=self.skipped,
+                failed=len(self.failed),
+            )
+
+    async def finish(self) -> Dict:
+        """Дожидается всех скриншотов и возвращает итоговый разбор"""
+        self._start()
+        await asyncio.gather(*self._tasks)
+        self.parsed = self._parse()
+        return self.parsed
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк OCR-бэкендов: pytesseract (процесс на вызов) vs tesserocr (хэндл в процессе).
+Латентность распознавания на изображение (предобработка не учитывается)
+для каждой языковой модели: rus, eng, rus+eng.
+
+Запуск:
+  python benchmarks/bench_backends.py [screenshot.jpg ...] [--repeat N] [--lang rus ...]
+"""
+
+import argparse
+import statistics
+import time
+
+from samples import load_images
+
+import ocr_service
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("images", nargs="*")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--lang", action="append", help="по умолчанию — rus, eng и OCR_LANG")
+    args = ap.parse_args()
+    langs = args.lang or list(ocr_service.SCRIPT_LANGS.values()) + [ocr_service.OCR_LANG]
+
+    prepared = [ocr_service._preprocess_image(img) for _, img in load_images(args.images)]
+
+    names = ["pytesseract"] + (["tesserocr"] if ocr_service.TESSEROCR_AVAILABLE else [])
+    print(f"{'backend':<12} {'lang':<8} {'first ms':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name in names:
+        backend = ocr_service.get_backend(name)
+        for lang in langs:
+            timings = []
+            try:
+                for _ in range(args.repeat):
+                    for img in prepared:
+                        t0 = time.perf_counter()
+                        backend.image_to_string(img, lang, ocr_service.TESSERACT_CONFIG)
+                        timings.append((time.perf_counter() - t0) * 1000)
+            except Exception as e:
+                print(f"{name:<12} {lang:<8} unavailable: {e}")
+                continue
+
+            # Первый вызов включает загрузку моделей языка
+            warm = timings[1:] or timings
+            p95 = sorted(warm)[min(len(warm) - 1, int(len(warm) * 0.95))]
+            print(
+                f"{name:<12} {lang:<8} {timings[0]:>9.1f} {statistics.mean(warm):>9.1f} "
+                f"{statistics.median(warm):>9.1f} {p95:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
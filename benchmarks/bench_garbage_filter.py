@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк фильтра мусора OCR: прежний цикл re.search по каждому шаблону
+vs один скомпилированный регэксп (garbage_filter). Строк в секунду.
+
+Запуск:
+  python benchmarks/bench_garbage_filter.py [ocr_dump.txt ...] [--lines N]
+"""
+
+import argparse
+import random
+import re
+import time
+
+import samples  # noqa: F401  (путь к корню репозитория)
+from garbage_filter import garbage_filter
+
+GARBAGE_LINES = [
+    "Позвонить", "Написать", "В избранное", "Показать телефон",
+    "+7 (999) 123-45-67", "4,9 ★ 128 отзывов", "Отвечает на сообщения за час",
+    "Похожие объявления", "Доставка Авито", "Кредит от 9,9%",
+]
+
+
+def _legacy_is_garbage(line: str) -> bool:
+    line_lower = line.lower()
+    for pattern in garbage_filter.rules:
+        if re.search(pattern, line_lower, re.IGNORECASE):
+            return True
+    return False
+
+
+def _make_dump(n: int):
+    from samples import SPEC_LINES
+    rnd = random.Random(0)
+    pool = SPEC_LINES * 3 + GARBAGE_LINES
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def _bench(name: str, func, lines) -> float:
+    t0 = time.perf_counter()
+    removed = sum(1 for line in lines if func(line))
+    elapsed = time.perf_counter() - t0
+    print(f"{name:<10} {len(lines) / elapsed:>12,.0f} lines/s   removed {removed}")
+    return elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("dumps", nargs="*")
+    ap.add_argument("--lines", type=int, default=200_000)
+    args = ap.parse_args()
+
+    if args.dumps:
+        lines = []
+        for path in args.dumps:
+            with open(path, "r", encoding="utf-8") as f:
+                lines.extend(line.strip() for line in f if line.strip())
+    else:
+        lines = _make_dump(args.lines)
+
+    legacy = _bench("legacy", _legacy_is_garbage, lines)
+    garbage_filter.reset_stats()
+    compiled = _bench("compiled", garbage_filter.is_garbage, lines)
+    print(f"speedup x{legacy / compiled:.1f}")
+
+    print("\nTop rules:")
+    for rule, hits in list(garbage_filter.stats().items())[:10]:
+        print(f"  {hits:>8}  {rule}")
+
+
+if __name__ == "__main__":
+    main()
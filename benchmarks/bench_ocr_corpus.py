@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк OCR на корпусе: скорость vs точность для вариантов предобработки/Tesseract.
+
+Корпус: benchmarks/ocr_corpus/<name>.(png|jpg) + <name>.json ({"expected": {...}}),
+синтетическая часть создаётся make_ocr_corpus.py.
+Каждый вариант запускается в отдельном процессе: латентность OCR + разбора
+на изображение (p50/p95/max), пиковый RSS и точность по полям CarDescriptionParser
+(parse() или parse_fields() для OCR_MODE=fields).
+
+Запуск:
+  python benchmarks/bench_ocr_corpus.py [--variant NAME ...] [--json results.json]
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+
+from samples import ROOT  # noqa: F401  (путь к корню репозитория)
+
+import ocr_service
+from parser import CarDescriptionParser
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_corpus")
+
+# Переопределения глобальных настроек ocr_service для каждого варианта.
+# Эскалация (OCR_ESCALATION) по умолчанию включена: варианты предобработки
+# выключают её явно, иначе большинство фрагментов читает быстрый проход
+# и порог/масштаб/движок почти не влияют на результат
+NO_ESCALATION = dict(OCR_ESCALATION=False)
+VARIANTS = {
+    "baseline_pil_x3": dict(PREPROCESS_ENGINE="pil", ADAPTIVE_SCALE=False, OCR_LAYOUT="crop", **NO_ESCALATION),
+    "pil_t120": dict(
+        PREPROCESS_ENGINE="pil", ADAPTIVE_SCALE=False, OCR_LAYOUT="crop", BINARY_THRESHOLD=120, **NO_ESCALATION,
+    ),
+    "pil_t160": dict(
+        PREPROCESS_ENGINE="pil", ADAPTIVE_SCALE=False, OCR_LAYOUT="crop", BINARY_THRESHOLD=160, **NO_ESCALATION,
+    ),
+    "pil_auto": dict(PREPROCESS_ENGINE="pil", ADAPTIVE_SCALE=True, OCR_LAYOUT="crop", **NO_ESCALATION),
+    "cv_x3": dict(PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=False, OCR_LAYOUT="crop", **NO_ESCALATION),
+    "cv_auto": dict(PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=True, OCR_LAYOUT="crop", **NO_ESCALATION),
+    "cv_auto_blocks_full": dict(
+        PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=True, OCR_LAYOUT="blocks", **NO_ESCALATION,
+    ),
+    "cv_auto_blocks_psm4": dict(
+        PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=True, OCR_LAYOUT="blocks",
+        TESSERACT_CONFIG="--oem 3 --psm 4", **NO_ESCALATION,
+    ),
+    "cv_auto_fields": dict(PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=True, OCR_MODE="fields", **NO_ESCALATION),
+    # С эскалацией: быстрый проход, пересчёт плохих строк, выбор модели по образцу
+    "cv_auto_blocks": dict(PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=True, OCR_LAYOUT="blocks", OCR_ESCALATION=True),
+    "cv_auto_blocks_rus_eng": dict(
+        PREPROCESS_ENGINE="opencv", ADAPTIVE_SCALE=True, OCR_LAYOUT="blocks", OCR_ESCALATION=True,
+        OCR_SCRIPT_DETECTION=False,
+    ),
+}
+
+SCALAR_FIELDS = ("title", "year", "drive", "engine_short", "gearbox", "color", "mileage_km")
+
+
+def load_corpus(corpus_dir: str = CORPUS_DIR):
+    items = []
+    for meta_path in sorted(glob.glob(os.path.join(corpus_dir, "*.json"))):
+        stem = meta_path[:-5]
+        image_path = next(
+            (stem + ext for ext in (".png", ".jpg", ".jpeg") if os.path.exists(stem + ext)), None
+        )
+        if image_path is None:
+            continue
+        with open(meta_path, "r", encoding="utf-8") as f:
+            items.append((image_path, json.load(f)["expected"]))
+    return items
+
+
+def _norm(text: str) -> str:
+    return "".join(ch for ch in str(text).lower() if ch.isalnum())
+
+
+def score_fields(expected: dict, actual: dict) -> dict:
+    """1.0/0.0 по каждому скалярному полю; для spec_items — доля найденных пунктов"""
+    scores = {}
+    for key in SCALAR_FIELDS:
+        if key in expected:
+            scores[key] = float(expected[key] == actual.get(key))
+    if expected.get("spec_items"):
+        found = {_norm(item) for item in actual.get("spec_items", [])}
+        hits = sum(1 for item in expected["spec_items"] if _norm(item) in found)
+        scores["spec_items"] = hits / len(expected["spec_items"])
+    return scores
+
+
+def _percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _run_variant(overrides: dict, corpus, repeat: int, queue) -> None:
+    """Отдельный процесс на вариант: переопределения и max RSS не смешиваются"""
+    for key, value in overrides.items():
+        setattr(ocr_service, key, value)
+    parser = CarDescriptionParser()
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencies, field_scores = [], {}
+    for image_path, expected in corpus:
+        parsed = {}
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            if overrides.get("OCR_MODE") == "fields":
+                parsed = parser.parse_fields(ocr_service.ocr_image_to_fields(image_path))
+            else:
+                parsed = parser.parse(ocr_service.ocr_image_to_text(image_path))
+            latencies.append((time.perf_counter() - t0) * 1000)
+        for key, score in score_fields(expected, parsed).items():
+            field_scores.setdefault(key, []).append(score)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    fields = {key: statistics.mean(values) for key, values in field_scores.items()}
+    queue.put({
+        "latency_ms": {
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "max": max(latencies),
+            "mean": statistics.mean(latencies),
+        },
+        "peak_rss_mb": peak_rss / 1024,
+        "peak_rss_growth_mb": (peak_rss - base_rss) / 1024,
+        "accuracy": statistics.mean(fields.values()) if fields else 0.0,
+        "fields": fields,
+    })
+
+
+def _check_tesseract() -> None:
+    if ocr_service.OCR_BACKEND == "pytesseract":
+        ocr_service.pytesseract.get_tesseract_version()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--variant", action="append", choices=sorted(VARIANTS), help="по умолчанию — все")
+    ap.add_argument("--corpus", default=CORPUS_DIR)
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--json", help="куда записать результаты")
+    args = ap.parse_args()
+
+    try:
+        _check_tesseract()
+    except Exception as e:
+        raise SystemExit(f"Tesseract недоступен: {e}")
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        raise SystemExit(f"Корпус пуст: {args.corpus} (запусти make_ocr_corpus.py)")
+
+    ctx = multiprocessing.get_context("fork")
+    results = {}
+    for name in args.variant or list(VARIANTS):
+        if VARIANTS[name].get("PREPROCESS_ENGINE") == "opencv" and not ocr_service.OPENCV_AVAILABLE:
+            continue
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_variant, args=(VARIANTS[name], corpus, args.repeat, queue))
+        proc.start()
+        results[name] = queue.get()
+        proc.join()
+
+    print(f"\n{len(corpus)} images, backend {ocr_service.OCR_BACKEND}")
+    print(f"{'variant':<22} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'RSS MB':>7} {'accuracy':>9}")
+    for name, r in results.items():
+        lat = r["latency_ms"]
+        print(
+            f"{name:<22} {lat['p50']:>8.0f} {lat['p95']:>8.0f} {lat['max']:>8.0f} "
+            f"{r['peak_rss_mb']:>7.0f} {r['accuracy']:>9.1%}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"images": len(corpus), "backend": ocr_service.OCR_BACKEND, "variants": results},
+                f, ensure_ascii=False, indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
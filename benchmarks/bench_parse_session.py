@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Проверка ParseSession: вставка, разбитая на части по границам строк, должна
+разбираться так же, как parse("\n".join(части)). В текстах есть значения,
+разорванные переводом строки («354» / «л.с.», «29 800» / «км»), и первые
+совпадения, которые разбор целого отбрасывает (объём 0 л, «12.5 л», метка
+«Цвет:» без цвета). Печатает время разбора частями и целиком; код выхода 1
+при расхождении.
+
+Запуск:
+  python benchmarks/bench_parse_session.py [--cases 2000] [--seed 0]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+import samples  # noqa: F401  (путь к корню репозитория)
+from parser import car_parser
+
+LINES = samples.SPEC_LINES + [
+    "354\nл.с.", "Мощность 190\nл.с", "249 л.\nс", "Пробег 29 800\nкм", "120 000\nкм", "2.0\nл",
+    "Пробег 45 000 км", "Мощность, л.с: 249", "• Объём двигателя, л: 2.5", "двигатель з,5 л",
+    "Рабочий объём 2995 см³", "объём двигателя 0 л двигатель 2 л", "12.5 л", "Расход топлива 8,5 л/100 км",
+    "Цвет: серый металлик", "Цвет: чёрный", "Цвет кузова серебристый", "черный салон", "гибрид",
+    "Год выпуска: 2021", "год выпуска 2015", "2019", "- привод полный", "Привод: полный", "робот DSG",
+    "Audi SQ5 Sportback 3.0 AT, 2021", "Цена 5 990 000 ₽", "5 10 км", "120 000 км/ч", "",
+]
+
+
+def _split(rnd: random.Random, text: str) -> list:
+    """Части по 1–4 строки, как Telegram режет длинную вставку"""
+    lines = text.split("\n")
+    parts = []
+    while lines:
+        size = rnd.randint(1, 4)
+        parts.append("\n".join(lines[:size]))
+        lines = lines[size:]
+    return [part for part in parts if part.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    mismatches = 0
+    session_time = parse_time = 0.0
+    for _ in range(args.cases):
+        text = "\n".join(rnd.choice(LINES) for _ in range(rnd.randint(2, 30))).strip()
+        parts = _split(rnd, text)
+
+        t0 = time.perf_counter()
+        session = car_parser.session()
+        for part in parts:
+            session.feed(part)
+        got = session.result()
+        t1 = time.perf_counter()
+        expected = car_parser.parse("\n".join(part.strip() for part in parts))
+        t2 = time.perf_counter()
+        session_time += t1 - t0
+        parse_time += t2 - t1
+
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"mismatch: {parts!r}")
+                for name in expected:
+                    if got[name] != expected[name]:
+                        print(f"  {name}: session {got[name]!r}, parse {expected[name]!r}")
+
+    print(f"cases {args.cases}, mismatches {mismatches}")
+    print(f"session {session_time / args.cases * 1000:.3f} ms, parse {parse_time / args.cases * 1000:.3f} ms per text")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
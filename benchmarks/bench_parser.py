@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк парсера: время parse и пропускная способность по размеру текста.
+
+Текст — «Ctrl+A» со страницы объявления: меню, цена, характеристики,
+описание, комплектация, блоки продавца и похожих объявлений.
+
+Запуск:
+  python benchmarks/bench_parser.py [paste.txt ...] [--kb 200] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+from samples import SPEC_LINES
+from parser import CarDescriptionParser
+
+PAGE_NOISE = [
+    "Авито", "Разместить объявление", "Войти", "Все категории", "Москва",
+    "Показать телефон", "Написать продавцу", "Добавить в избранное",
+    "Частное лицо", "На Авито с 2015", "Ответит в течение часа",
+    "Похожие объявления", "Пожаловаться на объявление", "Поделиться",
+]
+EQUIPMENT = [
+    "Климат-контроль 2-зонный", "Подогрев передних сидений", "Камера заднего вида",
+    "Электропривод багажника", "Датчик дождя", "Круиз-контроль адаптивный",
+    "Диски R20", "Шины 255/45 R20", "Фары светодиодные", "Панорамная крыша",
+    "Пусковой ток 680 А", "Дорожный просвет 200 мм", "Расход топлива 9,1 л/100 км",
+]
+DESCRIPTION = [
+    "Автомобиль в отличном состоянии, обслуживался у официального дилера.",
+    "Два комплекта резины, все ключи, сервисная книжка.",
+    "Торг у капота, обмен не интересен.",
+    "Не битый, не крашеный, один владелец по ПТС.",
+]
+
+
+def make_paste(kb: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    lines = []
+    size = 0
+    while size < kb * 1024:
+        block = (
+            rnd.sample(PAGE_NOISE, 5)
+            + [f"{rnd.randint(1, 9)} {rnd.randint(100, 999)} 000 ₽"]
+            + SPEC_LINES
+            + [f"• {item}" for item in rnd.sample(EQUIPMENT, 8)]
+            + rnd.sample(DESCRIPTION, 3)
+            + [f"Пробег {rnd.randint(1, 300)} {rnd.randint(100, 999)} км"]
+        )
+        lines.extend(block)
+        size += sum(len(line.encode("utf-8")) + 1 for line in block)
+    return "\n".join(lines)
+
+
+def _bench(func, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pastes", nargs="*")
+    ap.add_argument("--kb", type=int, action="append", help="размер синтетического текста (по умолчанию 2, 50, 200)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.pastes:
+        texts = []
+        for path in args.pastes:
+            with open(path, "r", encoding="utf-8") as f:
+                texts.append((path, f.read()))
+    else:
+        texts = [(f"synthetic {kb} KB", make_paste(kb)) for kb in args.kb or (2, 50, 200)]
+
+    parser = CarDescriptionParser()
+    print(f"{'text':<20} {'parse ms':>10} {'MB/s':>8}")
+    for name, text in texts:
+        best = _bench(parser.parse, text, args.repeat)
+        size = len(text.encode("utf-8")) / 1e6
+        print(f"{name:<20} {best * 1000:>10.2f} {size / best:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
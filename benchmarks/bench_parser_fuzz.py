@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Фаззинг-бенчмарк парсера на время: враждебные и мусорные тексты
+(длинные серии цифр, пробелов, ключевых слов, «İ» — lower() длиннее текста)
+размером до PARSER_MAX_INPUT и больше. Печатает худшее время по каждому
+генератору; код выхода 1, если parse или parse_fields дольше --limit-ms.
+
+Запуск:
+  python benchmarks/bench_parser_fuzz.py [--cases 50] [--limit-ms 1000] [--seed 0]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+import samples  # noqa: F401  (путь к корню репозитория)
+import parser as parser_module
+from parser import car_parser
+
+JUNK = "0123456789  \n\t.,:;/-•*км лсмАБВабв ABCXYZjxİ₽"
+
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+# Генератор: (random, размер) → текст
+GENERATORS = {
+    "digits": lambda rnd, n: _repeat("1", n),
+    "digits_spaced": lambda rnd, n: _repeat("1 ", n),
+    "digits_nbsp": lambda rnd, n: _repeat("12 ", n),
+    "digits_dots": lambda rnd, n: _repeat("1.", n),
+    "mileage_label": lambda rnd, n: "пробег " + _repeat("1 ", n),
+    "volume_label": lambda rnd, n: "объём двигателя " + _repeat("1", n),
+    "engine_spaces": lambda rnd, n: "двигатель 3" + " " * n + "x",
+    "cm3_label": lambda rnd, n: "рабочий объём " + _repeat("9", n),
+    "power": lambda rnd, n: _repeat("1 л ", n),
+    "units_no_newline": lambda rnd, n: _repeat("1 км ", n),
+    "upper": lambda rnd, n: _repeat("ABC ", n),
+    "keyword_lines": lambda rnd, n: _repeat("передач\n", n),
+    "title_latin": lambda rnd, n: "Audi" + _repeat(" 1", n),
+    "title_cyrillic": lambda rnd, n: "Ауди" + _repeat(" Ку5", n),
+    "dotted_i_digits": lambda rnd, n: "İ" + _repeat("1 ", n),
+    "junk": lambda rnd, n: "".join(rnd.choice(JUNK) for _ in range(n)),
+    "junk_tokens": lambda rnd, n: _repeat(
+        "".join(rnd.choice(["1", " ", "км", "л", "с", "пробег", "двигатель", "\n", "İ", "A"])
+                for _ in range(64)), n),
+}
+
+
+def _timed(func, arg) -> float:
+    started = time.perf_counter()
+    func(arg)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=20, help="текстов на генератор")
+    ap.add_argument("--limit-ms", type=float, default=1000.0)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    max_input = parser_module.PARSER_MAX_INPUT or 200_000
+    car_parser.warm_up()
+
+    print(f"PARSER_MAX_INPUT={parser_module.PARSER_MAX_INPUT} "
+          f"PARSER_TIME_BUDGET_MS={parser_module.PARSER_TIME_BUDGET_MS}")
+    print(f"{'generator':20s} {'parse ms':>9s} {'fields ms':>10s}")
+    worst = 0.0
+    for name, generate in GENERATORS.items():
+        worst_parse = worst_fields = 0.0
+        for case in range(args.cases):
+            # Размеры: короткие, на границе лимита и больше него (обрезка)
+            size = rnd.choice([1_000, max_input // 10, max_input, max_input * 2])
+            text = generate(rnd, size)
+            worst_parse = max(worst_parse, _timed(car_parser.parse, text))
+            worst_fields = max(worst_fields, _timed(car_parser.parse_fields, {"text": text, "pairs": []}))
+        print(f"{name:20s} {worst_parse:9.1f} {worst_fields:10.1f}")
+        worst = max(worst, worst_parse, worst_fields)
+
+    ok = worst <= args.limit_ms
+    print(f"worst {worst:.1f} ms, limit {args.limit_ms:.0f} ms: {'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк подготовки генератора КП: прежняя загрузка шрифтов в каждом
+KPPDFGenerator (разбор FreeSans TTF и registerFont на каждый PDF)
+vs общий font_manager (шрифты разбираются один раз на процесс).
+Время настройки генератора и полного PDF без фото, мс.
+
+Запуск:
+  python benchmarks/bench_pdf_fonts.py [--font-dir DIR] [--pdfs N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import samples  # noqa: F401  (путь к корню репозитория)
+import pdf_generator
+from pdf_generator import FONT_FILES, FontManager, KPPDFGenerator, generate_kp_pdf
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+CAR_DATA = {
+    "title": "Audi SQ5 Sportback",
+    "year": 2021,
+    "drive": "Полный",
+    "engine_short": "3л / 354 л.с. / Бензин",
+    "gearbox": "Автомат",
+    "color": "Чёрный",
+    "mileage_km": 29800,
+    "price_rub": 6990000,
+    "spec_items": samples.SPEC_LINES * 4,
+    "user_name": "Менеджер",
+}
+
+
+def _legacy_setup(font_dir: str) -> None:
+    """Как раньше в KPPDFGenerator.__init__: TTF разбираются заново"""
+    for name, filename in FONT_FILES.items():
+        pdfmetrics.registerFont(TTFont(name, os.path.join(font_dir, filename)))
+
+
+def _ms(func, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--font-dir", help="каталог с FreeSans.ttf и FreeSansBold.ttf")
+    ap.add_argument("--pdfs", type=int, default=20)
+    args = ap.parse_args()
+
+    manager = FontManager([args.font_dir] if args.font_dir else None, download=False)
+    pdf_generator.font_manager = manager
+
+    t0 = time.perf_counter()
+    font, _ = manager.fonts()
+    print(f"first load   {(time.perf_counter() - t0) * 1000:8.2f} ms  ({font})")
+
+    font_dir = manager._find_dir()
+    if font_dir:
+        print(f"legacy setup {_ms(lambda: _legacy_setup(font_dir), args.pdfs):8.2f} ms / PDF")
+    else:
+        print("legacy setup        —     (FreeSans not found, see --font-dir)")
+    print(f"shared setup {_ms(KPPDFGenerator, args.pdfs):8.2f} ms / PDF")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "kp.pdf")
+        total = _ms(lambda: generate_kp_pdf(CAR_DATA, [], path), args.pdfs)
+    print(f"full PDF     {total:8.2f} ms / PDF (no photos)")
+
+
+if __name__ == "__main__":
+    main()
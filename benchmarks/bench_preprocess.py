@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Микробенчмарк предобработки OCR: PIL vs OpenCV, фиксированный x3 vs адаптивный масштаб.
+Время на изображение, пиковая память (прирост max RSS) и размер результата.
+
+Запуск:
+  python benchmarks/bench_preprocess.py [screenshot.jpg ...] [--repeat N]
+"""
+
+import argparse
+import multiprocessing
+import resource
+import statistics
+import time
+
+from samples import load_images
+
+import ocr_service
+
+
+def _run_engine(engine: str, scale, images, repeat: int, queue) -> None:
+    """Отдельный процесс на вариант, чтобы max RSS не смешивались"""
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    megapixels = 0.0
+    for _ in range(repeat):
+        for _, img in images:
+            t0 = time.perf_counter()
+            out = ocr_service._preprocess_image(img, engine=engine, scale=scale)
+            timings.append((time.perf_counter() - t0) * 1000)
+            megapixels = out.width * out.height / 1e6
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((timings, (peak_rss - base_rss) / 1024, megapixels))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("images", nargs="*")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    images = load_images(args.images)
+    engines = ["pil"] + (["opencv"] if ocr_service.OPENCV_AVAILABLE else [])
+
+    ctx = multiprocessing.get_context("fork")
+    print(f"{'variant':<14} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9} {'peak +MB':>9} {'out MP':>7}")
+    for engine in engines:
+        for scale, scale_name in ((ocr_service.MAX_SCALE, "x3"), (None, "auto")):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_engine, args=(engine, scale, images, args.repeat, queue))
+            proc.start()
+            timings, peak_mb, megapixels = queue.get()
+            proc.join()
+            print(
+                f"{engine + '/' + scale_name:<14} {statistics.mean(timings):>9.1f} "
+                f"{statistics.median(timings):>9.1f} {max(timings):>9.1f} {peak_mb:>9.1f} {megapixels:>7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Нечёткие дубли спецификации (spec_dedup): проверка пар строк и скорость.
+Пары — опечатки OCR, которые должны склеиваться, и разные пункты,
+отличающиеся словом или числом, которые должны остаться оба.
+Код выхода 1, если хоть одна пара разобрана неверно.
+
+Запуск:
+  python benchmarks/bench_spec_dedup.py [--items 60] [--repeat 20]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+import samples  # noqa: F401  (путь к корню репозитория)
+from spec_dedup import dedup_spec_items
+
+# Опечатки OCR одной строки — остаётся один пункт
+SAME = [
+    ("Крутящий момент 470 Н·м", "Крутяший момент 470 Н·м"),
+    ("Дорожный просвет 230 мм", "Дорожный просвеr 230 мм"),
+    ("Тип двигателя: бензин", "Тип двигагеля: бензин"),
+    ("Шины 255/45 R20", "Шины 255/45 R2O"),
+    ("Обогрев руля", "Обогрев руля."),
+    ("Максимальная скорость 250 км/ч", "Максимальная скоросгь 250 км/ч"),
+]
+
+# Разные пункты — остаются оба
+DIFFERENT = [
+    ("Передняя подвеска: независимая, многорычажная, пневматическая",
+     "Задняя подвеска: независимая, многорычажная, пневматическая"),
+    ("Подогрев передних сидений", "Подогрев задних сидений"),
+    ("Электрорегулировка передних сидений", "Электрорегулировка задних сидений"),
+    ("Передние тормоза: дисковые вентилируемые", "Задние тормоза: дисковые вентилируемые"),
+    ("Электропривод левого зеркала", "Электропривод правого зеркала"),
+    ("Подушка безопасности водителя левая", "Подушка безопасности водителя правая"),
+    ("Руль: левый", "Руль: правый"),
+    ("Коробка: AT", "Коробка: MT"),
+    ("Количество мест 5", "Количество мест 7"),
+    ("Камера заднего вида", "Камера переднего вида"),
+]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=60, help="пунктов в тексте для замера")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    failures = 0
+    for pairs, expected in ((SAME, 1), (DIFFERENT, 2)):
+        for a, b in pairs:
+            result = dedup_spec_items([a, b])
+            if len(result) != expected:
+                failures += 1
+                print(f"FAIL ({len(result)} != {expected}): {a!r} / {b!r}")
+    print(f"pairs: {len(SAME) + len(DIFFERENT)}, failures: {failures}")
+
+    rnd = random.Random(0)
+    pool = [line for pair in SAME + DIFFERENT for line in pair] + samples.SPEC_LINES
+    items = [f"{rnd.choice(pool)} {i}" for i in range(args.items)]
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        dedup_spec_items(items)
+    elapsed = (time.perf_counter() - started) / args.repeat * 1000
+    print(f"{args.items} items: {elapsed:.2f} ms")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
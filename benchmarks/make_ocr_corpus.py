@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Генерирует синтетическую часть корпуса OCR: benchmarks/ocr_corpus/<name>.png + <name>.json.
+Ожидаемый результат — CarDescriptionParser.parse() исходного (идеально распознанного) текста.
+
+Реальные скриншоты добавляются в тот же каталог вручную: <name>.jpg + <name>.json
+с ключом "expected" (можно указать только часть полей).
+
+Запуск:
+  python benchmarks/make_ocr_corpus.py
+"""
+
+import json
+import os
+
+from samples import render_screenshot
+
+from parser import CarDescriptionParser
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_corpus")
+
+LISTINGS = {
+    "audi_sq5": [
+        "Audi SQ5 Sportback",
+        "Год выпуска: 2021",
+        "Пробег: 29 800 км",
+        "Двигатель 3л / 354 л.с. / Бензин",
+        "Коробка передач: автомат",
+        "Привод: полный",
+        "Цвет: чёрный",
+        "Длина 4689 мм",
+        "Разгон до 100 км/ч 5.1 c",
+    ],
+    "kia_k5": [
+        "Kia K5 Prestige",
+        "Год выпуска: 2022",
+        "Пробег: 41 500 км",
+        "Объём двигателя: 2.5 л",
+        "Мощность 194 л.с.",
+        "Коробка передач: автомат",
+        "Привод: передний",
+        "Цвет: белый",
+        "Ширина 1860 мм",
+    ],
+    "toyota_lc": [
+        "Toyota Land Cruiser 300",
+        "Год выпуска: 2023",
+        "Пробег: 12 000 км",
+        "Двигатель 3.3л / 299 л.с. / Дизель",
+        "Коробка передач: автомат",
+        "Привод: полный",
+        "Цвет: серый",
+        "Дорожный просвет 230 мм",
+    ],
+}
+
+# (имя, listing, ширина, высота, кегль, тёмная тема, фото)
+VARIANTS = [
+    ("audi_sq5_iphone", "audi_sq5", 1170, 2532, 42, False, True),
+    ("kia_k5_lowres", "kia_k5", 720, 1560, 18, False, True),
+    ("toyota_lc_dark", "toyota_lc", 1080, 2340, 36, True, False),
+    ("audi_sq5_scroll", "audi_sq5", 1080, 6000, 38, False, True),
+]
+
+FIELDS = ("title", "year", "drive", "engine_short", "gearbox", "color", "mileage_km", "spec_items")
+
+
+def main():
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    parser = CarDescriptionParser()
+    for name, listing, width, height, font_size, dark, photo in VARIANTS:
+        lines = LISTINGS[listing]
+        img, drawn = render_screenshot(width, height, lines, font_size, dark=dark, photo=photo)
+        img.save(os.path.join(CORPUS_DIR, f"{name}.png"), optimize=True)
+
+        # Первый проход строк — как одно объявление (повторы ниже — прокрутка)
+        parsed = parser.parse("\n".join(drawn[:len(lines)]))
+        expected = {key: parsed[key] for key in FIELDS}
+        with open(os.path.join(CORPUS_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"source": "synthetic", "expected": expected}, f, ensure_ascii=False, indent=2)
+        print(f"✅ {name}: {width}x{height}, font {font_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Синтетические скриншоты для бенчмарков (если нет реальных).
+"""
+
+import os
+import sys
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Бенчмарки запускаются из каталога benchmarks/ или из корня репозитория
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SPEC_LINES = [
+    "Audi SQ5 Sportback 3.0 AT, 2021",
+    "Год выпуска: 2021",
+    "Пробег: 29 800 км",
+    "Двигатель 3л / 354 л.с. / Бензин",
+    "Коробка передач: автомат",
+    "Привод: полный",
+    "Цвет: чёрный",
+    "Руль: левый",
+    "Длина 4689 мм",
+    "Разгон до 100 км/ч 5.1 c",
+]
+
+
+def _font(size: int):
+    for path in (
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/tmp/fonts/FreeSans.ttf",
+    ):
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default()
+
+
+def render_screenshot(
+    width: int,
+    height: int,
+    lines,
+    font_size: int = 42,
+    dark: bool = False,
+    photo: bool = True,
+):
+    """
+    Скриншот телефона: фон, (опционально) блок «фото», строки текста.
+    Возвращает (изображение, нарисованные строки).
+    """
+    bg, fg = ((18, 18, 18), (235, 235, 235)) if dark else ((255, 255, 255), (20, 20, 20))
+    img = Image.new("RGB", (width, height), bg)
+    draw = ImageDraw.Draw(img)
+    font = _font(font_size)
+
+    y = int(height * 0.12)
+    if photo:
+        # «Фото» объявления: градиент, чтобы были полутона
+        photo_bottom = int(height * 0.35)
+        for row in range(y, photo_bottom):
+            shade = 80 + (row - y) * 120 // max(1, photo_bottom - y)
+            draw.line((0, row, width, row), fill=(shade, shade + 10, shade + 20))
+        y = int(height * 0.38)
+
+    drawn = []
+    line_h = int(font_size * 1.8)
+    i = 0
+    while y < height * 0.84:
+        line = lines[i % len(lines)]
+        draw.text((40, y), line, fill=fg, font=font)
+        drawn.append(line)
+        y += line_h
+        i += 1
+    return img, drawn
+
+
+def make_screenshot(width: int = 1170, height: int = 2532, font_size: int = 42) -> Image.Image:
+    """Скриншот телефона: белый фон, строки характеристик, блок «фото»"""
+    img, _ = render_screenshot(width, height, SPEC_LINES, font_size)
+    return img
+
+
+def load_images(paths):
+    """Изображения из аргументов командной строки или синтетический скриншот"""
+    if paths:
+        return [(os.path.basename(p), Image.open(p).convert("RGB")) for p in paths]
+    return [("synthetic_1170x2532", make_screenshot())]
@@ -7,15 +7,23 @@ Telegram бот "Генератор КП"
 import os
 import logging
 import time
+import uuid
 import asyncio
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError, TelegramRetryAfter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from parser import CarDescriptionParser
+from parser import car_parser
+from parse_memo import parse_memo
+from spec_dedup import SpecDeduplicator
 from sheets_logger import sheets_logger
+from ocr_executor import ocr_executor
+from ocr_cache import ocr_cache
+from garbage_filter import garbage_filter
+from album_pipeline import AlbumPipeline, AlbumProgress
 
 # Настройка логирования
 logging.basicConfig(
@@ -51,8 +59,17 @@ dp = Dispatcher(storage=storage)
 last_message_tracker = {}
 DUPLICATE_TIMEOUT = 2.0
 
+# Сборка длинного описания: Telegram режет вставку на сообщения по 4096 символов
+paste_storage = {}
+PASTE_WINDOW = 1.5          # сек ожидания следующей части
+PASTE_PART_LENGTH = 3500    # сообщение такой длины и длиннее — вероятно, не последняя часть
+
 # Хранилище для альбомов
 album_storage = {}
+STATUS_EDIT_INTERVAL = 1.0  # сек между правками статуса альбома
+
+# Фоновые задачи (дораспознавание альбомов): держим ссылки, чтобы их не собрал GC
+background_tasks = set()
 
 
 def is_duplicate_message(user_id: int, text: str) -> bool:
@@ -224,8 +241,65 @@ def format_spec_list(spec_items: list) -> str:
     return "\n".join(lines)
 
 
+def format_album_progress(progress: AlbumProgress) -> str:
+    """Статус распознавания альбома: какие поля уже найдены (БЕЗ Markdown!)"""
+    labels = [
+        ("title", "Название"),
+        ("year", "Год"),
+        ("engine_short", "Двигатель"),
+        ("gearbox", "Коробка"),
+        ("drive", "Привод"),
+        ("color", "Цвет"),
+        ("mileage_km", "Пробег"),
+    ]
+    
+    lines = [f"🔍 Распознано {progress.done} из {progress.total} скриншотов"]
+    if progress.skipped:
+        lines[0] += f" (дублей: {progress.skipped})"
+    if progress.failed:
+        lines[0] += f", не удалось: {progress.failed}"
+    lines.append("")
+    
+    for key, label in labels:
+        value = progress.parsed.get(key)
+        if value is None:
+            lines.append(f"⏳ {label}")
+        else:
+            lines.append(f"✅ {label}: {value}")
+    
+    spec_count = len(progress.parsed.get('spec_items', []))
+    if spec_count:
+        lines.append(f"📋 Спецификация: {spec_count} пунктов")
+    
+    return "\n".join(lines)
+
+
 # ==================== ОБРАБОТКА АЛЬБОМОВ ====================
 
+async def edit_status(message: types.Message, text: str):
+    """Обновляет статусное сообщение (ошибки правки не критичны)"""
+    try:
+        await message.edit_text(text)
+    except TelegramBadRequest as e:
+        # "message is not modified" и т.п.
+        logger.debug(f"Status edit skipped: {e}")
+    except TelegramRetryAfter as e:
+        # Лимит частоты правок: статус догонит следующая правка
+        logger.info(f"Status edit skipped: flood control, retry after {e.retry_after}s")
+    except TelegramNetworkError as e:
+        logger.warning(f"Status edit failed: {e}")
+
+
+def format_failed_photos(failed: dict) -> str:
+    """Какие скриншоты не распознаны и что делать (БЕЗ Markdown!); пусто — все распознаны"""
+    if not failed:
+        return ""
+    numbers = ", ".join(str(index + 1) for index in sorted(failed))
+    if "busy" in failed.values():
+        return f"⚠️ Не распознаны скриншоты №{numbers}: бот сейчас загружен. Отправь их ещё раз через минуту"
+    return f"⚠️ Не распознаны скриншоты №{numbers}. Отправь их ещё раз или сделай чётче"
+
+
 async def process_album(user_id: int, chat_id: int, state: FSMContext):
     """Обрабатывает накопленные фото после задержки"""
     await asyncio.sleep(1.0)
@@ -233,64 +307,95 @@ async def process_album(user_id: int, chat_id: int, state: FSMContext):
     if user_id not in album_storage:
         return
     
-    photos = album_storage[user_id]['photos']
-    del album_storage[user_id]
+    album_info = album_storage.pop(user_id)
+    photos = album_info['photos']
     
     if not photos:
         return
     
+    status_message = album_info.get('status_message')
+    
     try:
-        # Скачиваем все фото
-        photo_paths = []
-        for i, photo_id in enumerate(photos):
+        logger.info(f"Processing {len(photos)} screenshots for user {user_id}")
+        
+        async def download(i: int, photo_id: str) -> str:
             file = await bot.get_file(photo_id)
             photo_path = f"/tmp/screenshot_{user_id}_{i}.jpg"
             await bot.download_file(file.file_path, photo_path)
-            photo_paths.append(photo_path)
-        
-        logger.info(f"Processing {len(photo_paths)} screenshots for user {user_id}")
+            return photo_path
         
-        # OCR на всех фото
-        from ocr_service import ocr_image_to_text
+        # Каждый скриншот: скачивание → проверка на дубль → OCR (в пуле процессов)
+        # → разбор. Статус в чате обновляется после каждого скриншота.
+        # Как только основные поля найдены — показываем карточку,
+        # остальные скриншоты дорабатывают в фоне для спецификации
+        if status_message is None:
+            status_message = await bot.send_message(chat_id, f"⏳ Распознаю {len(photos)} скриншотов...")
         
-        all_text = []
-        for i, photo_path in enumerate(photo_paths):
-            try:
-                text = ocr_image_to_text(photo_path)
-                all_text.append(text)
-                logger.info(f"OCR photo {i+1}/{len(photo_paths)}: {len(text)} chars")
-            except Exception as e:
-                logger.error(f"OCR error on photo {i+1}: {e}")
-        
-        # Объединяем весь текст
-        combined_text = "\n\n".join(all_text)
+        pipeline = AlbumPipeline(photos, download=download)
+        parsed_data = {}
+        last_edit = 0.0
+        async for progress in pipeline.run():
+            parsed_data = progress.parsed
+            early_exit = progress.complete and progress.done < progress.total
+            
+            # Telegram ограничивает частоту правок: не чаще раза в STATUS_EDIT_INTERVAL
+            now = time.monotonic()
+            if early_exit or progress.done == progress.total or now - last_edit >= STATUS_EDIT_INTERVAL:
+                await edit_status(status_message, format_album_progress(progress))
+                last_edit = now
+            
+            if early_exit:
+                logger.info(
+                    f"All card fields found after {progress.done}/{progress.total} screenshots "
+                    f"for user {user_id}"
+                )
+                break
         
+        skipped = pipeline.skipped
+        photo_count = pipeline.processed
+        failed_note = format_failed_photos(pipeline.failed)
+        if not photo_count and pipeline.failed:
+            # Ни один скриншот не распознан — карточку не показываем, ждём повторной отправки
+            await bot.send_message(chat_id, failed_note)
+            return
+        combined_text = pipeline.combined_text()
         logger.info(f"Combined OCR text length: {len(combined_text)} chars")
         
-        # Парсим
-        parser = CarDescriptionParser()
-        parsed_data = parser.parse(combined_text)
-        
+        album_id = uuid.uuid4().hex
         await state.update_data(
             description_text=combined_text,
             car_data=parsed_data,
-            photos=[]
+            photos=[],
+            ocr_album_id=album_id
         )
         
+        if pipeline.pending:
+            task = asyncio.create_task(enrich_album_spec(
+                pipeline, state, album_id, list(parsed_data.get('spec_items', [])), combined_text
+            ))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+        
         spec_count = len(parsed_data.get('spec_items', []))
         card_text = format_car_card(parsed_data, show_price=False)
         
         # Проверяем что пользователь ещё в состоянии ожидания
         current_state = await state.get_state()
         if current_state == KPStates.waiting_screenshot:
+            skipped_note = f" (пропущено дублей: {skipped})" if skipped else ""
+            header = f"✅ Обработано {photo_count} скриншотов{skipped_note}!"
+            if failed_note:
+                header += "\n" + failed_note
+            if pipeline.pending:
+                header += f"\n⏳ Ещё {pipeline.pending} дораспознаются в фоне и дополнят спецификацию"
             await bot.send_message(
                 chat_id,
-                f"✅ Обработано {len(photo_paths)} скриншотов!\n\n" + card_text,
+                header + "\n\n" + card_text,
                 reply_markup=get_edit_card_kb(spec_count),
                 parse_mode="Markdown"
             )
             await state.set_state(KPStates.editing_card)
-            logger.info(f"User {user_id} processed {len(photo_paths)} screenshots successfully")
+            logger.info(f"User {user_id} processed {photo_count} screenshots successfully")
         
     except Exception as e:
         logger.error(f"Error processing album: {e}", exc_info=True)
@@ -306,6 +411,46 @@ async def process_album(user_id: int, chat_id: int, state: FSMContext):
         await state.clear()
 
 
+async def enrich_album_spec(
+    pipeline: AlbumPipeline, state: FSMContext, album_id: str, shown_items: list, shown_text: str
+):
+    """
+    Дополняет спецификацию текстом скриншотов, распознанных после показа карточки.
+    Новое — то, чего не было в показанной карточке (shown_items); оно только дописывается
+    к текущему списку пользователя и проходит проверку нечётких дублей против него:
+    удалённые и исправленные пользователем пункты не возвращаются.
+    """
+    try:
+        final_data = await pipeline.finish()
+        
+        data = await state.get_data()
+        if data.get("ocr_album_id") != album_id:
+            # Пользователь начал заново или загрузил другой альбом
+            return
+        
+        car_data = data.get("car_data", {})
+        spec_items = car_data.get('spec_items', [])
+        dedup = SpecDeduplicator()
+        for item in spec_items + shown_items:
+            dedup.add(item)
+        shown = set(shown_items)
+        new_items = [
+            item for item in final_data.get('spec_items', [])
+            if item not in shown and dedup.add(item)
+        ]
+        if not new_items:
+            return
+        
+        car_data['spec_items'] = spec_items + new_items
+        update = {'car_data': car_data}
+        if data.get('description_text') == shown_text:
+            update['description_text'] = pipeline.combined_text()
+        await state.update_data(**update)
+        logger.info(f"Album {album_id}: added {len(new_items)} spec items from remaining screenshots")
+    except Exception as e:
+        logger.error(f"Error enriching album spec: {e}", exc_info=True)
+
+
 # ==================== ХЕНДЛЕРЫ ====================
 
 @dp.message(Command("start"))
@@ -319,6 +464,7 @@ async def cmd_start(message: types.Message, state: FSMContext):
         return
     
     await state.clear()
+    drop_paste(user_id)
     
     await message.answer(
         f"Привет, {message.from_user.first_name}! 👋\n\n"
@@ -338,6 +484,9 @@ async def start_create_kp_text(message: types.Message, state: FSMContext):
     """Начало создания КП через текст"""
     await state.clear()
     
+    # Незавершённая вставка от прошлой попытки больше не нужна
+    drop_paste(message.from_user.id)
+    
     await message.answer(
         "📋 Отлично! Создадим КП через текст.\n\n"
         "**Шаг 1 из 3:** Отправь мне описание автомобиля.\n\n"
@@ -358,6 +507,7 @@ async def start_create_kp_text(message: types.Message, state: FSMContext):
 async def start_create_kp_screenshot(message: types.Message, state: FSMContext):
     """Начало создания КП через скриншот"""
     await state.clear()
+    drop_paste(message.from_user.id)
     
     await message.answer(
         "📸 Отлично! Создадим КП через скриншот.\n\n"
@@ -410,17 +560,67 @@ async def show_instruction(message: types.Message):
 
 @dp.message(KPStates.waiting_description, F.text)
 async def process_description(message: types.Message, state: FSMContext):
-    """Обработка описания (текстовый режим)"""
+    """Обработка описания (текстовый режим): длинная вставка может прийти несколькими сообщениями"""
+    user_id = message.from_user.id
     
     # Проверка на дубль
-    if is_duplicate_message(message.from_user.id, message.text):
-        logger.info(f"Ignoring duplicate message from user {message.from_user.id}")
+    if is_duplicate_message(user_id, message.text):
+        logger.info(f"Ignoring duplicate message from user {user_id}")
+        return
+    
+    paste = paste_storage.get(user_id)
+    if paste is None:
+        paste = paste_storage[user_id] = {
+            'session': None,
+            'parts': [],
+            'timer': None,
+        }
+    paste['parts'].append(message.text)
+    
+    # Длинная вставка: каждая часть разбирается сразу, при завершении остаётся
+    # только собрать результат. Описание одним сообщением разбирается при
+    # завершении через parse_memo (повторная вставка — из памяти)
+    if paste['session'] is None and len(message.text) >= PASTE_PART_LENGTH:
+        paste['session'] = car_parser.session()
+    if paste['session'] is not None:
+        paste['session'].feed(message.text)
+    
+    if paste['timer']:
+        paste['timer'].cancel()
+    if len(message.text) >= PASTE_PART_LENGTH:
+        # Похоже на часть длинной вставки — ждём продолжение
+        paste['timer'] = asyncio.create_task(finish_description(user_id, message, state, PASTE_WINDOW))
+    else:
+        paste['timer'] = None
+        await finish_description(user_id, message, state)
+
+
+def drop_paste(user_id: int) -> None:
+    """Забывает незавершённую вставку и отменяет её таймер (сброс, смена режима)"""
+    paste = paste_storage.pop(user_id, None)
+    if paste and paste['timer']:
+        paste['timer'].cancel()
+
+
+async def finish_description(user_id: int, message: types.Message, state: FSMContext, delay: float = 0.0):
+    """Показывает карточку по всем частям описания"""
+    if delay:
+        await asyncio.sleep(delay)
+    
+    paste = paste_storage.pop(user_id, None)
+    if paste is None:
+        return
+    # Пока ждали продолжение, пользователь мог сбросить или сменить режим
+    if await state.get_state() != KPStates.waiting_description:
+        logger.info(f"Dropping stale paste of user {user_id}: state changed")
         return
     
     try:
-        parser = CarDescriptionParser()
-        description_text = message.text
-        parsed_data = parser.parse(description_text)
+        description_text = "\n".join(paste['parts'])
+        if paste['session'] is not None:
+            parsed_data = paste['session'].result()
+        else:
+            parsed_data = parse_memo.parse(description_text)
         
         await state.update_data(
             description_text=description_text,
@@ -437,7 +637,7 @@ async def process_description(message: types.Message, state: FSMContext):
             parse_mode="Markdown"
         )
         await state.set_state(KPStates.editing_card)
-        logger.info(f"User {message.from_user.id} parsed description successfully")
+        logger.info(f"User {user_id} parsed description successfully ({len(paste['parts'])} parts)")
         
     except Exception as e:
         logger.error(f"Error parsing description: {e}")
@@ -457,28 +657,39 @@ async def process_screenshot(message: types.Message, state: FSMContext):
     photo_id = message.photo[-1].file_id
     
     # Инициализируем хранилище для пользователя
-    if user_id not in album_storage:
+    is_first_photo = user_id not in album_storage
+    if is_first_photo:
         album_storage[user_id] = {
             'photos': [],
             'timer': None,
-            'chat_id': chat_id
+            'chat_id': chat_id,
+            'status_message': None,
+            'status_edited_at': 0.0,
         }
+    album_info = album_storage[user_id]
     
     # Добавляем фото
-    album_storage[user_id]['photos'].append(photo_id)
+    album_info['photos'].append(photo_id)
     
-    # Отменяем старый таймер
-    if album_storage[user_id]['timer']:
-        album_storage[user_id]['timer'].cancel()
-    
-    # Отправляем статус
-    photo_count = len(album_storage[user_id]['photos'])
-    await message.answer(f"📸 Получено {photo_count} фото... (ожидаю остальные)")
-    
-    # Запускаем новый таймер
-    album_storage[user_id]['timer'] = asyncio.create_task(
+    # Перезапускаем таймер до любых запросов к Telegram: ошибка статуса
+    # не должна оставить альбом без обработки
+    if album_info['timer']:
+        album_info['timer'].cancel()
+    album_info['timer'] = asyncio.create_task(
         process_album(user_id, chat_id, state)
     )
+    
+    # Статус — одно сообщение на альбом, дальше оно редактируется
+    # не чаще раза в STATUS_EDIT_INTERVAL (фото альбома приходят почти разом)
+    photo_count = len(album_info['photos'])
+    status_text = f"📸 Получено {photo_count} фото... (ожидаю остальные)"
+    now = time.monotonic()
+    if is_first_photo:
+        album_info['status_edited_at'] = now
+        album_info['status_message'] = await message.answer(status_text)
+    elif album_info['status_message'] is not None and now - album_info['status_edited_at'] >= STATUS_EDIT_INTERVAL:
+        album_info['status_edited_at'] = now
+        await edit_status(album_info['status_message'], status_text)
 
 
 @dp.callback_query(F.data.startswith("edit_"))
@@ -897,6 +1108,7 @@ async def reset_photos_handler(callback: types.CallbackQuery, state: FSMContext)
 async def reset_start_handler(callback: types.CallbackQuery, state: FSMContext):
     """Начать заново"""
     await state.clear()
+    drop_paste(callback.from_user.id)
     await callback.message.answer(
         "🔄 Начинаем заново. Выбери способ:",
         reply_markup=get_main_menu()
@@ -948,11 +1160,20 @@ async def on_startup():
     logger.info("=" * 50)
     logger.info("Бот запущен!")
     logger.info(f"Whitelist: {bool(ALLOWED_USERS)}")
+    logger.info(f"OCR workers: {ocr_executor.workers}, queue limit: {ocr_executor.max_queue}")
     logger.info("=" * 50)
+    car_parser.warm_up()
+    # Шрифты КП: первый PDF не ждёт разбора TTF (поиск/скачивание — в потоке)
+    from pdf_generator import font_manager
+    await asyncio.to_thread(font_manager.fonts)
 
 
 async def on_shutdown():
     """При остановке бота"""
+    ocr_executor.shutdown()
+    logger.info(f"OCR cache: {ocr_cache.stats()}")
+    logger.info(f"Parse memo: {parse_memo.stats()}")
+    logger.info(f"Garbage filter: {garbage_filter.stats()}")
     logger.info("Бот остановлен")
 
 
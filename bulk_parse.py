@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Пакетный разбор сохранённых описаний объявлений (офлайн, без бота).
+Вход — JSONL (объект или строка на строку) или CSV с заголовком,
+выход — JSONL: исходная запись + car_data (результат CarDescriptionParser.parse).
+Записи читаются потоком, разбор — пачками в пуле процессов.
+Запись, которую не удалось разобрать (ошибка парсера или нет поля с текстом),
+не останавливает разбор: в выход идёт {"id": ..., "error": ...}, где id — поле
+id записи или её номер во входе; число ошибок — в итоговой строке лога.
+
+Запуск:
+  python bulk_parse.py listings.jsonl -o cards.jsonl [--text-field description]
+                       [--workers 8] [--chunk-size 256]
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+from collections import deque
+from typing import Dict, Iterator
+
+from parser import car_parser
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 10_000  # записей между строками прогресса
+
+
+def read_records(path: str, text_field: str) -> Iterator[Dict]:
+    """Записи входного файла: CSV — по расширению, иначе JSONL"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"{path}:{line_no}: skipping invalid JSON: {e}")
+                continue
+            # Строка JSONL может быть просто текстом описания
+            yield record if isinstance(record, dict) else {text_field: record}
+
+
+def bulk_parse(
+    input_path: str,
+    output_path: str,
+    text_field: str = "description",
+    workers: int = 1,
+    chunk_size: int = 256,
+) -> int:
+    """Разбирает файл с записями, пишет JSONL; возвращает число записей"""
+    # Записи, тексты которых уже отданы в разбор, но результат ещё не записан:
+    # (номер, запись, есть ли поле с текстом)
+    pending: deque = deque()
+    
+    def texts() -> Iterator[str]:
+        for index, record in enumerate(read_records(input_path, text_field), 1):
+            has_text = text_field in record
+            pending.append((index, record, has_text))
+            yield str(record.get(text_field) or "")
+    
+    count = 0
+    failed = 0
+    missing = 0
+    started = time.perf_counter()
+    out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        for parsed in car_parser.parse_many(texts(), workers=workers, chunk_size=chunk_size):
+            index, record, has_text = pending.popleft()
+            error = parsed.get("error")
+            if not has_text:
+                missing += 1
+                if missing == 1:
+                    logger.warning(f"Record {record.get('id', index)} has no '{text_field}' field (check --text-field)")
+                error = f"missing field '{text_field}'"
+            if error:
+                failed += 1
+                out.write(json.dumps({"id": record.get("id", index), "error": error}, ensure_ascii=False) + "\n")
+            else:
+                record["car_data"] = parsed
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+            if count % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                logger.info(f"{count} records, {count / elapsed:.0f} records/sec")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Done: {count} records in {elapsed:.1f}s ({rate:.0f} records/sec, workers={workers}), "
+        f"failed {failed} (no '{text_field}' field: {missing})"
+    )
+    return count
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Пакетный разбор описаний объявлений в JSONL")
+    ap.add_argument("input", help="JSONL или CSV с описаниями")
+    ap.add_argument("-o", "--output", default="-", help="куда писать JSONL (по умолчанию stdout)")
+    ap.add_argument("--text-field", default="description", help="поле с текстом описания")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов разбора")
+    ap.add_argument("--chunk-size", type=int, default=256, help="текстов в одной задаче пула")
+    args = ap.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    bulk_parse(args.input, args.output, args.text_field, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Словарь марок и моделей для поиска названия автомобиля в тексте.
+Источник — car_models.txt (строка на марку). При загрузке собираются
+регэксп-автоматы (деревья префиксов): один по всем маркам и по одному на модели
+каждой марки. Текст проверяется одним проходом: совпадение марки → модель сразу за ней.
+
+Сравнение устойчиво к ошибкам OCR: буквы-двойники (кириллица/латиница, З/3, 0/O, l/1/I)
+сводятся к одному символу и в словаре, и в тексте; длина текста при этом
+не меняется, позиции совпадений указывают в исходный текст. Текст сворачивается
+и проверяется окнами по целым строкам: поиск останавливается на первом названии,
+длинная вставка целиком не перекодируется.
+
+Настройки (переменные окружения):
+- CAR_MODELS_FILE — путь к словарю
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+CAR_MODELS_FILE = os.getenv(
+    "CAR_MODELS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "car_models.txt"),
+)
+
+# Буквы, которые OCR путает: всё сводится к одному представителю (после lower())
+LOOKALIKES = {
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o',
+    'п': 'n', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'з': '3',
+    '0': 'o', '1': 'l', 'i': 'l', '|': 'l',
+}
+
+# Слова после модели, на которых название заканчивается (коробка передач)
+TITLE_STOP_WORDS = {'at', 'mt', 'amt', 'cvt', 'rt', 'dct', 'dsg'}
+TITLE_MAX_EXTRA_WORDS = 3
+
+
+def _fold_table() -> str:
+    """
+    Таблица для str.translate: регистр и буквы-двойники, символ → символ.
+    Строка по кодам латиницы и кириллицы: поиск по индексу быстрее словаря,
+    остальные символы остаются как есть.
+    """
+    table = []
+    for code in range(0x500):
+        ch = chr(code)
+        low = ch.lower()
+        table.append(LOOKALIKES.get(low, low) if len(low) == 1 else ch)
+    return ''.join(table)
+
+
+FOLD_TABLE = _fold_table()
+
+
+def fold(text: str) -> str:
+    """Текст для сравнения со словарём (та же длина, что у исходного)"""
+    return text.translate(FOLD_TABLE)
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Регэксп-автомат для набора слов: общие префиксы слиты в дерево
+    ("передач", "передн" → "перед(?:ач|н)"), на каждой позиции — один проход по дереву
+    вместо проверки каждого слова по отдельности.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if '' in node else body
+    
+    return build(trie)
+
+
+def load_models(path: str) -> List[Tuple[List[str], List[List[str]]]]:
+    """
+    Строки словаря: "Марка|синоним: Модель|синоним, Модель, ...", # — комментарий.
+    Возвращает [(написания марки, [написания модели, ...]), ...];
+    написание марки с ~ в начале — обычное слово (см. CarModels.model_only)
+    """
+    makes = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            make, _, models = line.partition(":")
+            names = [name.strip() for name in make.split("|") if name.strip()]
+            variants = [
+                [name.strip() for name in model.split("|") if name.strip()]
+                for model in models.split(",") if model.strip()
+            ]
+            makes.append((names, variants))
+    return makes
+
+
+class CarModels:
+    """Скомпилированный словарь: поиск «марка [модель]» одним проходом по тексту"""
+    
+    _GLUED = re.compile(r'[\w\-]*')                  # продолжение модели: "GLE" + "-класс"
+    _NEXT_WORD = re.compile(r'[^\S\n]+([^\s,;/•|]+)')
+    _YEAR = re.compile(r'(?:19|20)\d\d')
+    WINDOW = 4096  # символов текста, сворачиваемых за раз
+    
+    def __init__(self, makes: List[Tuple[List[str], List[List[str]]]]):
+        # Свёрнутое написание → каноническое (первое в строке словаря)
+        self.makes: Dict[str, str] = {}
+        self.models: Dict[str, Dict[str, str]] = {}
+        # Написания марки, которые сами по себе — обычные слова ("Газ", "Мини-вэн"):
+        # марка только вместе с моделью
+        self.model_only: Set[str] = set()
+        for names, variants in makes:
+            canonical = names[0].lstrip('~')
+            for name in names:
+                if name.startswith('~'):
+                    name = name[1:]
+                    self.model_only.add(fold(name))
+                self.makes.setdefault(fold(name), canonical)
+            models = self.models.setdefault(canonical, {})
+            for variant in variants:
+                for name in variant:
+                    models.setdefault(fold(name), variant[0])
+        
+        self._make_regex = re.compile(r'(?<!\w)(?:' + trie_pattern(self.makes) + r')(?!\w)')
+        self._model_regex = {
+            make: re.compile(r'[^\S\n]+(' + trie_pattern(models) + r')(?!\w)')
+            for make, models in self.models.items() if models
+        }
+    
+    @classmethod
+    def from_file(cls, path: str = CAR_MODELS_FILE) -> "CarModels":
+        return cls(load_models(path))
+    
+    def find(self, text: str, make_only: bool = True) -> Optional[Tuple[int, str]]:
+        """
+        Название по словарю: (ранг, название) или None.
+        Ранг 0 — первая в тексте «марка модель», ранг 1 — только марка
+        (первая с заглавной буквы, если модели из словаря в тексте нет;
+        make_only=False — не искать). Марка без модели встречается и в тексте
+        объявления ("Тип двигателя: Газ"), поэтому парсер ищет её только
+        в строке названия.
+        """
+        found = None
+        start = 0
+        while start < len(text):
+            # Окно по границе строки: название не переходит через \n
+            end = text.find('\n', start + self.WINDOW)
+            if end < 0:
+                end = len(text)
+            folded = fold(text[start:end])
+            for match in self._make_regex.finditer(folded):
+                make = self.makes[match.group()]
+                model_regex = self._model_regex.get(make)
+                model = model_regex.match(folded, match.end()) if model_regex else None
+                if model:
+                    name = self.models[make][model.group(1)]
+                    return 0, self._title(text, f"{make} {name}", start + model.end())
+                if (
+                    make_only and found is None
+                    and text[start + match.start()].isupper()
+                    and match.group() not in self.model_only
+                ):
+                    found = (1, self._title(text, make, start + match.end()))
+            start = end
+        return found
+    
+    def _title(self, text: str, name: str, end: int) -> str:
+        """
+        Название: каноническое «марка модель» + слитное продолжение из текста
+        и до TITLE_MAX_EXTRA_WORDS слов исполнения/поколения ("Sportback", "300", "xDrive40i").
+        Останавливается на годе, объёме, коробке передач и словах со строчной буквы.
+        """
+        glued = self._GLUED.match(text, end)
+        name += glued.group()
+        pos = glued.end()
+        for _ in range(TITLE_MAX_EXTRA_WORDS):
+            word = self._NEXT_WORD.match(text, pos)
+            if not word:
+                break
+            token = word.group(1)
+            if (
+                token.lower() in TITLE_STOP_WORDS
+                or self._YEAR.fullmatch(token)
+                or any(ch in token for ch in '.,₽')
+                or not (token[0].isupper() or any(ch.isdigit() for ch in token))
+            ):
+                break
+            # Число без букв — часть названия, только если за ним не единица ("249 л.с.")
+            if token.isdigit() and self._NEXT_WORD.match(text, word.end()):
+                break
+            name += " " + token
+            pos = word.end()
+        return name
+
+
+car_models = CarModels.from_file()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Фильтр мусорных строк OCR.
+Все шаблоны компилируются один раз в один регэксп-альтернацию:
+один проход по строке вместо прохода на каждый шаблон.
+Какое правило сработало, уточняется только для мусорных строк (статистика).
+Статистика воркеров OCR возвращается с результатом задачи и сливается в процессе
+бота (ocr_executor), там же периодически пишется в лог.
+Правила пишутся в нижнем регистре: строка приводится к нижнему регистру один раз.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import hashlib
+import threading
+from collections import Counter
+from typing import List, Optional
+
+GARBAGE_RULES_FILE = os.getenv(
+    "OCR_GARBAGE_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "garbage_rules.txt"),
+)
+
+
+def load_rules(path: str) -> List[str]:
+    """Шаблоны из файла: один регэксп на строку, # — комментарий"""
+    rules = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                rules.append(line)
+    return rules
+
+
+class GarbageFilter:
+    """Скомпилированный набор правил + статистика попаданий"""
+
+    def __init__(self, rules: List[str]):
+        self.rules = list(rules)
+        # Отпечаток набора правил (входит в ключ кэша OCR)
+        self.digest = hashlib.sha1("\n".join(self.rules).encode("utf-8")).hexdigest()[:8]
+        # Ошибка компиляции сразу указывает на конкретное правило
+        self._compiled = [re.compile(rule) for rule in self.rules]
+        # Без именованных групп: с ними re не оптимизирует альтернацию (в ~5 раз медленнее)
+        alternation = "|".join(f"(?:{rule})" for rule in self.rules)
+        self._regex = re.compile(alternation or r"(?!)")
+        self._hits: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str = GARBAGE_RULES_FILE) -> "GarbageFilter":
+        return cls(load_rules(path))
+
+    def match(self, line: str) -> Optional[str]:
+        """Правило, под которое попала строка, или None"""
+        line_lower = line.lower()
+        m = self._regex.search(line_lower)
+        if m is None:
+            return None
+        # Первое правило, совпадающее в той же позиции, что и альтернация
+        pos = m.start()
+        rule = next(
+            (r for r, rx in zip(self.rules, self._compiled) if rx.match(line_lower, pos)),
+            self.rules[0],
+        )
+        with self._lock:
+            self._hits[rule] += 1
+        return rule
+
+    def is_garbage(self, line: str) -> bool:
+        return self.match(line) is not None
+
+    def stats(self) -> dict:
+        """Попадания по правилам (по убыванию)"""
+        with self._lock:
+            return dict(self._hits.most_common())
+
+    def take_stats(self) -> dict:
+        """Попадания с прошлого вызова (счётчики обнуляются) — для передачи из воркера OCR"""
+        with self._lock:
+            hits = dict(self._hits)
+            self._hits.clear()
+            return hits
+
+    def add_stats(self, hits: dict) -> None:
+        """Добавляет попадания, посчитанные в другом процессе"""
+        with self._lock:
+            self._hits.update(hits)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._hits.clear()
+
+
+garbage_filter = GarbageFilter.from_file()
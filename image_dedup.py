@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Поиск почти одинаковых скриншотов (perceptual hash).
+Один и тот же экран дважды или пересъёмка со сдвигом на несколько пикселей
+отбрасываются до OCR.
+
+Настройки (переменные окружения):
+- SCREENSHOT_DEDUP_THRESHOLD — доля различающихся бит dHash, при которой
+  снимки считаются дублями (0 — отключить)
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_DEDUP_THRESHOLD = float(os.getenv("SCREENSHOT_DEDUP_THRESHOLD", "0.03"))
+HASH_SIZE = 16  # dHash 16x16 = 256 бит: мелкие различия текста видны лучше, чем в 8x8
+
+
+def dhash(image_path: str, hash_size: int = HASH_SIZE) -> int:
+    """
+    Разностный хэш: миниатюра (hash_size + 1) x hash_size в сером,
+    бит = «пиксель ярче соседа справа».
+    Строка состояния (верхние 5%) не учитывается — там меняется время.
+    """
+    with Image.open(image_path) as img:
+        # JPEG декодируется сразу в уменьшенном виде
+        img.draft("L", (img.width // 8, img.height // 8))
+        img = img.convert("L")
+        img = img.crop((0, int(img.height * 0.05), img.width, img.height))
+        thumb = img.resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+
+    pixels = list(thumb.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class DuplicateDetector:
+    """Инкрементальная проверка: снимки приходят по одному (потокобезопасно)"""
+
+    def __init__(self, threshold: float = SCREENSHOT_DEDUP_THRESHOLD):
+        self.max_distance = int(threshold * HASH_SIZE * HASH_SIZE)
+        self.enabled = threshold > 0
+        self._seen: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+
+    def check(self, image_path: str) -> Optional[str]:
+        """Путь ранее принятого снимка, дублем которого является этот, или None"""
+        if not self.enabled:
+            return None
+        try:
+            h = dhash(image_path)
+        except Exception as e:
+            logger.warning(f"dHash failed for {image_path}: {e}")
+            return None
+
+        with self._lock:
+            for seen_path, seen_hash in self._seen:
+                if hamming(h, seen_hash) <= self.max_distance:
+                    logger.info(f"Skipping near-duplicate screenshot {image_path} (same as {seen_path})")
+                    return seen_path
+            self._seen.append((image_path, h))
+        return None
+
+
+def dedup_screenshots(
+    image_paths: List[str], threshold: float = SCREENSHOT_DEDUP_THRESHOLD
+) -> Tuple[List[str], int]:
+    """
+    Убирает почти одинаковые изображения (оставляет первое из группы).
+    Возвращает (оставшиеся пути, сколько пропущено).
+    """
+    detector = DuplicateDetector(threshold)
+    kept = [path for path in image_paths if detector.check(path) is None]
+    return kept, len(image_paths) - len(kept)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Кэш результатов OCR.
+Ключ — sha256 от байтов изображения + конфигурации OCR
+(предобработка, язык, параметры Tesseract).
+
+Два уровня:
+- память: LRU на OCR_CACHE_MEMORY_ITEMS записей
+- диск: каталог OCR_CACHE_DIR, LRU по времени доступа, не больше OCR_CACHE_DISK_MB
+"""
+
+from __future__ import annotations
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "/tmp/ocr_cache")
+OCR_CACHE_MEMORY_ITEMS = int(os.getenv("OCR_CACHE_MEMORY_ITEMS", "256"))
+OCR_CACHE_DISK_MB = float(os.getenv("OCR_CACHE_DISK_MB", "64"))
+
+
+def image_cache_key(image_bytes: bytes, config_signature: str) -> str:
+    """Ключ кэша: хэш содержимого изображения + конфигурации OCR"""
+    h = hashlib.sha256()
+    h.update(config_signature.encode("utf-8"))
+    h.update(b"\0")
+    h.update(image_bytes)
+    return h.hexdigest()
+
+
+class OCRCache:
+    """Двухуровневый LRU-кэш текста OCR"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = OCR_CACHE_DIR,
+        memory_items: int = OCR_CACHE_MEMORY_ITEMS,
+        disk_bytes: int = int(OCR_CACHE_DISK_MB * 1024 * 1024),
+    ):
+        self.cache_dir = cache_dir
+        self.memory_items = max(0, memory_items)
+        self.disk_bytes = max(0, disk_bytes)
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> размер файла
+        self._disk_total = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir and self.disk_bytes:
+            self._load_disk_index()
+
+    # -----------------------------
+    # Disk tier
+    # -----------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _load_disk_index(self) -> None:
+        """Восстанавливает LRU-порядок диска по mtime файлов"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".txt"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+        except OSError as e:
+            logger.warning(f"OCR cache dir unavailable, disk tier disabled: {e}")
+            self.disk_bytes = 0
+            return
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_total += size
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_total > self.disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # mtime = время последнего доступа (для LRU после рестарта)
+        except OSError:
+            self._disk_total -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return text
+
+    def _write_disk(self, key: str, text: str) -> None:
+        data = text.encode("utf-8")
+        if len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"OCR cache write failed: {e}")
+            return
+
+        if key in self._disk:
+            self._disk_total -= self._disk.pop(key)
+        self._disk[key] = len(data)
+        self._disk_total += len(data)
+        self._evict_disk()
+
+    # -----------------------------
+    # Memory tier
+    # -----------------------------
+
+    def _put_memory(self, key: str, text: str) -> None:
+        if not self.memory_items:
+            return
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # -----------------------------
+    # Public
+    # -----------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return text
+
+            if self.disk_bytes:
+                text = self._read_disk(key)
+                if text is not None:
+                    self._put_memory(key, text)
+                    self.disk_hits += 1
+                    return text
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        # Пустой текст — обычно ошибка OCR, не кэшируем
+        if not text:
+            return
+        with self._lock:
+            self._put_memory(key, text)
+            if self.disk_bytes:
+                self._write_disk(key, text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_total,
+            }
+
+
+ocr_cache = OCRCache()
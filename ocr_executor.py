@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Пул процессов для OCR.
+Tesseract работает в отдельных процессах, event loop бота не блокируется.
+
+Настройки (переменные окружения):
+- OCR_WORKERS               — число процессов (по умолчанию = доступные ядра)
+- OCR_MAX_QUEUE             — максимум задач в работе + в очереди
+- OCR_JOB_TIMEOUT           — таймаут одной задачи, секунды
+- OCR_MAX_JOBS_PER_WORKER   — после скольких задач на процесс пул пересоздаётся
+Потоки для блоков и полос внутри воркера (OCR_BLOCK_THREADS) ограничены ядрами
+на воркер: при OCR_WORKERS = числу ядер блоки читаются по очереди.
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import ocr_service
+from garbage_filter import garbage_filter
+from ocr_cache import ocr_cache, image_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cpus() -> int:
+    """Число ядер, доступных процессу (учитывает affinity/cgroup cpuset)"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return max(1, os.cpu_count() or 1)
+
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or _available_cpus()
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "0")) or OCR_WORKERS * 4
+OCR_JOB_TIMEOUT = float(os.getenv("OCR_JOB_TIMEOUT", "60"))
+OCR_MAX_JOBS_PER_WORKER = int(os.getenv("OCR_MAX_JOBS_PER_WORKER", "50"))
+GARBAGE_STATS_EVERY = 100  # задач между строками лога со статистикой фильтра мусора
+
+
+class OCRQueueFull(RuntimeError):
+    """Очередь OCR переполнена"""
+
+
+def _warm_up() -> None:
+    """Загружает модели языка в текущем потоке (хэндлы tesserocr — свои у каждого потока)"""
+    models = [(ocr_service.OCR_LANG, ocr_service.TESSERACT_CONFIG)]
+    # Эскалация и выбор модели — только в режиме text (ocr_image_to_fields их не использует)
+    if ocr_service.OCR_MODE == "text" and ocr_service.OCR_ESCALATION:
+        models.append((ocr_service.OCR_LANG, ocr_service.line_config()))
+        if ocr_service.OCR_SCRIPT_DETECTION:
+            # Быстрый проход одной моделью (rus / eng)
+            models += [(lang, ocr_service.TESSERACT_CONFIG) for lang in ocr_service.SCRIPT_LANGS.values()]
+    try:
+        for lang, config in models:
+            ocr_service.get_backend().warm_up(lang, config)
+    except Exception as e:
+        logger.warning(f"OCR backend warm-up failed: {e}")
+
+
+def _init_worker(workers: int = OCR_WORKERS) -> None:
+    """Инициализация процесса пула: Tesseract в один поток, один пул потоков на процесс"""
+    # Параллелизм даёт пул, а не OpenMP внутри tesseract
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    # Счётчики фильтра мусора, унаследованные от бота при fork, уже учтены там
+    garbage_filter.reset_stats()
+    
+    # Потоки для блоков/полос — в пределах ядер на воркер, чтобы воркеры не делили ядра;
+    # пул живёт весь срок процесса, модели в его потоках грузятся при старте потока
+    threads = min(ocr_service.OCR_BLOCK_THREADS, _available_cpus() // max(1, workers))
+    ocr_service.init_thread_pool(threads, initializer=_warm_up)
+    
+    # Модели языка грузим сразу, а не на первой задаче
+    _warm_up()
+
+
+def _run_job(func, *args) -> tuple:
+    """Задача в воркере: результат + попадания фильтра мусора за эту задачу"""
+    result = func(*args)
+    return result, garbage_filter.take_stats()
+
+
+class OCRExecutor:
+    """
+    Ограниченный пул процессов для OCR.
+    - Размер пула — по числу ядер
+    - Лимит очереди: лишние задачи отклоняются сразу (OCRQueueFull)
+    - В пул отдаётся не больше workers задач, остальные ждут здесь: таймаут
+      считается от передачи в пул, то есть от начала работы, а не с ожидания в очереди
+    - Таймаут на задачу; зависший пул пересоздаётся, его процессы завершаются
+    - Пул пересоздаётся после workers * max_jobs_per_worker задач
+      (освобождаем память, накопленную Pillow/Tesseract)
+    """
+
+    def __init__(
+        self,
+        workers: int = OCR_WORKERS,
+        max_queue: int = OCR_MAX_QUEUE,
+        job_timeout: float = OCR_JOB_TIMEOUT,
+        max_jobs_per_worker: int = OCR_MAX_JOBS_PER_WORKER,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max(self.workers, max_queue)
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs_in_pool = 0
+        self._pending = 0
+        self._jobs_done = 0
+        # Свободные воркеры: задача попадает в пул, только когда её есть кому выполнить
+        self._slots = asyncio.Semaphore(self.workers)
+
+    # -----------------------------
+    # Pool lifecycle
+    # -----------------------------
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # fork: spawn/forkserver заново импортируют bot.py в каждом воркере
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(self.workers,),
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = self._new_pool()
+            self._jobs_in_pool = 0
+            logger.info(f"OCR pool started: {self.workers} workers")
+        elif self._jobs_in_pool >= self.workers * self.max_jobs_per_worker:
+            self._recycle("job limit reached")
+        return self._pool
+
+    def _recycle(self, reason: str, terminate: bool = False) -> None:
+        """
+        Пересоздаёт пул. Старый дорабатывает свои задачи и завершается;
+        terminate — процессы старого пула завершаются сразу (зависшая задача).
+        """
+        old = self._pool
+        self._pool = self._new_pool()
+        self._jobs_in_pool = 0
+        logger.info(f"OCR pool recycled: {reason}")
+        if old is not None:
+            if terminate:
+                self._terminate(old)
+            else:
+                old.shutdown(wait=False, cancel_futures=False)
+
+    @staticmethod
+    def _terminate(pool: ProcessPoolExecutor) -> None:
+        """
+        Останавливает пул и завершает его процессы: shutdown(wait=False) не прерывает
+        зависший tesseract, и процесс-сирота занимал бы ядро. Остальные задачи
+        этого пула, и запущенные, и ждущие в очереди, получают BrokenProcessPool
+        (run повторяет их в новом пуле). Без cancel_futures: отменённая задача
+        отдала бы CancelledError, а не ошибку пула.
+        """
+        processes = list((pool._processes or {}).values())
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        pool.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # -----------------------------
+    # Public
+    # -----------------------------
+
+    @property
+    def pending(self) -> int:
+        """Задачи в работе + в очереди"""
+        return self._pending
+
+    async def run(self, func, *args):
+        """Выполняет func(*args) в пуле и ожидает результат"""
+        if self._pending >= self.max_queue:
+            raise OCRQueueFull(f"OCR queue is full ({self._pending}/{self.max_queue})")
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                return await self._submit(func, *args)
+        finally:
+            self._pending -= 1
+
+    async def _submit(self, func, *args):
+        """Задача в пуле с таймаутом на выполнение (слот воркера уже занят)"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._get_pool()
+            self._jobs_in_pool += 1
+            try:
+                result, garbage_hits = await asyncio.wait_for(
+                    loop.run_in_executor(pool, _run_job, func, *args),
+                    timeout=self.job_timeout,
+                )
+                self._add_garbage_stats(garbage_hits)
+                return result
+            except asyncio.TimeoutError:
+                # Воркер может висеть дальше — завершаем процессы его пула
+                if pool is self._pool:
+                    self._recycle("job timeout", terminate=True)
+                else:
+                    self._terminate(pool)
+                raise
+            except BrokenProcessPool:
+                if pool is self._pool:
+                    self._recycle("broken pool")
+                    raise
+                # Пул завершён из-за чужой зависшей задачи — один повтор в новом пуле
+                if attempt:
+                    raise
+                logger.info("OCR job retried: its pool was terminated")
+            except asyncio.CancelledError:
+                # Отменили вызывающего — отменяемся; иначе задачу снял завершённый пул
+                if asyncio.current_task().cancelling() or pool is self._pool or attempt:
+                    raise
+                logger.info("OCR job retried: cancelled by a terminated pool")
+
+    def _add_garbage_stats(self, hits: dict) -> None:
+        """Сливает статистику воркера в фильтр процесса бота, раз в GARBAGE_STATS_EVERY задач — в лог"""
+        garbage_filter.add_stats(hits)
+        self._jobs_done += 1
+        if self._jobs_done % GARBAGE_STATS_EVERY == 0:
+            top = list(garbage_filter.stats().items())[:10]
+            logger.info(f"Garbage filter after {self._jobs_done} OCR jobs, top rules: {top}")
+
+    @staticmethod
+    def _cache_key(image_path: str, mode: str = "text") -> str:
+        """Ключ кэша по содержимому файла (чтение и хэш — блокирующие, вызывать через to_thread)"""
+        signature = ocr_service.ocr_config_signature()
+        if mode != "text":
+            signature += f"|{mode}"
+        with open(image_path, "rb") as f:
+            return image_cache_key(f.read(), signature)
+
+    async def ocr_image(self, image_path: str) -> str:
+        """Асинхронный OCR одного изображения (с кэшем по содержимому)"""
+        # Чтение файла, хэш и дисковый кэш — в потоке, event loop не ждёт диск
+        key = await asyncio.to_thread(self._cache_key, image_path)
+        text = await asyncio.to_thread(ocr_cache.get, key)
+        if text is not None:
+            logger.info(f"OCR cache hit for {os.path.basename(image_path)}")
+            return text
+
+        text = await self.run(ocr_service.ocr_image_to_text, image_path, self.job_timeout)
+        await asyncio.to_thread(ocr_cache.put, key, text)
+        return text
+
+    async def ocr_fields(self, image_path: str) -> dict:
+        """Асинхронный OCR в режиме таблицы: {"text", "pairs"} (кэш — JSON)"""
+        key = await asyncio.to_thread(self._cache_key, image_path, "fields")
+        cached = await asyncio.to_thread(ocr_cache.get, key)
+        if cached is not None:
+            logger.info(f"OCR cache hit for {os.path.basename(image_path)} (fields)")
+            return json.loads(cached)
+
+        result = await self.run(ocr_service.ocr_image_to_fields, image_path, self.job_timeout)
+        if result["text"] or result["pairs"]:
+            await asyncio.to_thread(ocr_cache.put, key, json.dumps(result, ensure_ascii=False))
+        return result
+
+
+ocr_executor = OCRExecutor()
+
+
+async def ocr_image_async(image_path: str) -> str:
+    """Асинхронный OCR через общий пул процессов"""
+    return await ocr_executor.ocr_image(image_path)
+
+
+async def ocr_fields_async(image_path: str) -> dict:
+    """Асинхронный OCR таблицы характеристик через общий пул процессов"""
+    return await ocr_executor.ocr_fields(image_path)
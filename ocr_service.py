@@ -10,9 +10,18 @@ from __future__ import annotations
 
 import re
 import os
-from typing import Optional
+import math
+import time
+import threading
+import importlib.util
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
 
-from PIL import Image, ImageOps, ImageEnhance
+from PIL import Image, ImageOps, ImageEnhance, ImageStat
+
+from garbage_filter import garbage_filter
+from text_stitch import stitch_texts
 
 # Tesseract
 try:
@@ -22,29 +31,295 @@ except ImportError:
     TESSERACT_AVAILABLE = False
     print("❌ Tesseract not available")
 
+# tesserocr (опционально): libtesseract в процессе, без запуска tesseract на каждый вызов.
+# Импортируется лениво в воркере, после установки OMP_THREAD_LIMIT
+TESSEROCR_AVAILABLE = importlib.util.find_spec("tesserocr") is not None
+
+# NumPy (опционально, для оценки высоты текста)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
 # OpenCV (опционально)
 try:
     import cv2
-    import numpy as np
-    OPENCV_AVAILABLE = True
+    OPENCV_AVAILABLE = NUMPY_AVAILABLE
 except Exception:
     OPENCV_AVAILABLE = False
 
 
-# Список мусора для постобработки
-GARBAGE_PATTERNS = [
-    r'позвонить', r'написать', r'поделиться', r'избранное',
-    r'пожаловаться', r'в\s+избранное', r'добавить\s+в',
-    r'назад', r'меню', r'главная', r'каталог', r'поиск',
-    r'авито', r'доставка\s+авито', r'безопасная\s+сделка',
-    r'\+7[\s\-\(\)]*\d{3}[\s\-\(\)]*\d{3}[\s\-]*\d{2}[\s\-]*\d{2}',
-    r'показать\s+телефон', r'показать\s+номер',
-    r'москва,\s*ул\.', r'показать\s+на\s+карте',
-    r'реклама', r'купить', r'заказать', r'кредит\s+от',
-    r'рассрочка', r'лизинг', r'\d+,\d+\s+★', r'\d+\s+отзыв',
-    r'рейтинг', r'отвечает\s+на\s+сообщения',
-    r'похожие\s+объявления', r'сохранить',
-]
+# Настройки Tesseract
+OCR_LANG = "rus+eng"
+TESSERACT_CONFIG = "--oem 3 --psm 6"
+
+# Движок предобработки: "opencv" (если установлен) или "pil"
+PREPROCESS_ENGINE = os.getenv("OCR_PREPROCESS_ENGINE", "opencv" if OPENCV_AVAILABLE else "pil")
+if PREPROCESS_ENGINE == "opencv" and not OPENCV_AVAILABLE:
+    PREPROCESS_ENGINE = "pil"
+
+# Масштаб: подбирается по высоте строчных букв (x-height) или фиксированный x3
+ADAPTIVE_SCALE = os.getenv("OCR_ADAPTIVE_SCALE", "1") == "1" and NUMPY_AVAILABLE
+MAX_SCALE = 3.0
+TARGET_X_HEIGHT = 22  # px, Tesseract лучше всего читает x-height ~20-30 px
+
+# Порог бинаризации для PIL-движка (OpenCV использует Otsu)
+BINARY_THRESHOLD = int(os.getenv("OCR_BINARY_THRESHOLD", "140"))
+
+# Раскладка: "blocks" — OCR только найденных блоков текста (параллельно),
+# "crop" — весь кадр с обрезкой верха/низа (запасной вариант)
+OCR_LAYOUT = os.getenv("OCR_LAYOUT", "blocks" if OPENCV_AVAILABLE else "crop")
+if OCR_LAYOUT == "blocks" and not OPENCV_AVAILABLE:
+    OCR_LAYOUT = "crop"
+OCR_BLOCK_THREADS = int(os.getenv("OCR_BLOCK_THREADS", "2"))  # потоков на процесс (не больше ядер на воркер)
+LAYOUT_WIDTH = 600  # ширина уменьшенной копии для поиска блоков
+
+# Длинные скриншоты (scroll capture): OCR полосами с перекрытием
+OCR_TILE_TRIGGER = int(os.getenv("OCR_TILE_TRIGGER", "4000"))  # высота, px
+OCR_TILE_HEIGHT = int(os.getenv("OCR_TILE_HEIGHT", "1600"))
+OCR_TILE_OVERLAP = int(os.getenv("OCR_TILE_OVERLAP", "160"))
+
+# Эскалация по уверенности: сначала дешёвый проход (серый, до x1.5),
+# полная предобработка — только для строк/фрагментов с низкой уверенностью Tesseract
+OCR_ESCALATION = os.getenv("OCR_ESCALATION", "1") == "1"
+FAST_MAX_SCALE = 1.5
+OCR_CONF_THRESHOLD = float(os.getenv("OCR_CONF_THRESHOLD", "75"))            # средняя по фрагменту
+OCR_LINE_CONF_THRESHOLD = float(os.getenv("OCR_LINE_CONF_THRESHOLD", "60"))  # средняя по строке
+OCR_ESCALATE_MAX_LINES = 6  # больше плохих строк — дешевле пересчитать весь фрагмент
+
+# Выбор языковой модели по образцу текста: чисто кириллический экран читается
+# одной моделью rus (примерно вдвое быстрее rus+eng). Работает только вместе
+# с эскалацией: строки с латиницей получают низкую уверенность и перечитываются OCR_LANG
+OCR_SCRIPT_DETECTION = os.getenv("OCR_SCRIPT_DETECTION", "1") == "1"
+SCRIPT_LANGS = {"cyrillic": "rus", "latin": "eng"}
+SCRIPT_SAMPLE_HEIGHT = 400   # высота полосы-образца, px
+SCRIPT_MIN_LETTERS = 20      # меньше букв в образце — не угадываем
+SCRIPT_MINOR_SHARE = 0.05    # доля «чужого» алфавита, ниже которой хватает одной модели
+
+# Режим: "text" — плоский текст, "fields" — ещё и пары «название | значение»
+# из двухколоночной таблицы характеристик (по координатам слов image_to_data).
+# fields — один полный проход OCR_LANG на кадр или полосу: без блоков,
+# эскалации по уверенности и выбора модели, поэтому не по умолчанию
+OCR_MODE = os.getenv("OCR_MODE", "text")
+KV_MIN_GUTTER = 0.04  # минимальный промежуток между колонками, доля ширины
+KV_MIN_ROWS = 3       # столько строк подряд с колонкой значений на одной вертикали — таблица
+
+# Версии предобработки: менять при любом изменении _preprocess_image_*/_clean_text,
+# иначе кэш OCR будет отдавать результаты старого пайплайна
+PREPROCESS_VERSIONS = {
+    "pil": "pil-crop10-85-c2-s2",
+    "opencv": "cv-crop10-85-clahe-cubic-unsharp-otsu",
+}
+
+
+# -----------------------------
+# OCR backends
+# -----------------------------
+
+class OCRWord(NamedTuple):
+    """Слово из image_to_data"""
+    text: str
+    conf: float   # 0..100
+    line: tuple   # (block, par, line) — ключ строки
+    box: tuple    # (x0, y0, x1, y1)
+
+
+class PytesseractBackend:
+    """tesseract CLI через pytesseract: процесс и загрузка моделей на каждый вызов"""
+    
+    name = "pytesseract"
+    
+    def warm_up(self, lang: str, config: str) -> None:
+        pass
+    
+    def image_to_string(self, img: Image.Image, lang: str, config: str, timeout: float = 0) -> str:
+        return pytesseract.image_to_string(img, lang=lang, config=config, timeout=timeout)
+    
+    def image_to_data(self, img: Image.Image, lang: str, config: str, timeout: float = 0) -> list:
+        data = pytesseract.image_to_data(
+            img, lang=lang, config=config, timeout=timeout, output_type=pytesseract.Output.DICT
+        )
+        words = []
+        for i, text in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not text.strip():
+                continue
+            x, y = data["left"][i], data["top"][i]
+            words.append(OCRWord(
+                text.strip(), conf,
+                (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+                (x, y, x + data["width"][i], y + data["height"][i]),
+            ))
+        return words
+
+
+class TesserocrBackend:
+    """
+    libtesseract через tesserocr: долгоживущие API-хэндлы.
+    Один хэндл на (поток, язык, конфиг) — модели языка грузятся один раз на воркер.
+    Таймаут вызова не прерывает: срок задачи проверяется между вызовами (_time_left),
+    зависший вызов прерывает пул процессов (ocr_executor завершает воркеры).
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self):
+        self._local = threading.local()
+    
+    @staticmethod
+    def _parse_config(config: str) -> tuple[int, int, dict]:
+        """'--oem 3 --psm 6 -c key=value' → (oem, psm, variables)"""
+        oem, psm, variables = 3, 3, {}
+        tokens = config.split()
+        for i, token in enumerate(tokens[:-1]):
+            if token == "--oem":
+                oem = int(tokens[i + 1])
+            elif token == "--psm":
+                psm = int(tokens[i + 1])
+            elif token == "-c" and "=" in tokens[i + 1]:
+                key, value = tokens[i + 1].split("=", 1)
+                variables[key] = value
+        return oem, psm, variables
+    
+    def _api(self, lang: str, config: str):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        key = (lang, config)
+        api = apis.get(key)
+        if api is None:
+            import tesserocr
+            oem, psm, variables = self._parse_config(config)
+            api = tesserocr.PyTessBaseAPI(lang=lang, oem=oem, psm=psm)
+            for name, value in variables.items():
+                api.SetVariable(name, value)
+            apis[key] = api
+            print(f"🧠 Tesseract API loaded: {lang} ({config}) in pid {os.getpid()}")
+        return api
+    
+    def warm_up(self, lang: str, config: str) -> None:
+        self._api(lang, config)
+    
+    def image_to_string(self, img: Image.Image, lang: str, config: str, timeout: float = 0) -> str:
+        if img.mode == "1":
+            img = img.convert("L")
+        api = self._api(lang, config)
+        api.SetImage(img)
+        return api.GetUTF8Text()
+    
+    def image_to_data(self, img: Image.Image, lang: str, config: str, timeout: float = 0) -> list:
+        import tesserocr
+        if img.mode == "1":
+            img = img.convert("L")
+        api = self._api(lang, config)
+        api.SetImage(img)
+        api.Recognize()
+        it = api.GetIterator()
+        if it is None:
+            return []
+        
+        word_level = tesserocr.RIL.WORD
+        block = par = line = 0
+        words = []
+        for w in tesserocr.iterate_level(it, word_level):
+            if w.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block += 1
+            if w.IsAtBeginningOf(tesserocr.RIL.PARA):
+                par += 1
+            if w.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line += 1
+            text = w.GetUTF8Text(word_level)
+            if not text or not text.strip():
+                continue
+            words.append(OCRWord(text.strip(), w.Confidence(word_level), (block, par, line), w.BoundingBox(word_level)))
+        return words
+
+
+OCR_BACKENDS = {
+    "pytesseract": PytesseractBackend,
+    "tesserocr": TesserocrBackend,
+}
+
+# Бэкенд OCR: "tesserocr" (если установлен) или "pytesseract"
+OCR_BACKEND = os.getenv("OCR_BACKEND", "tesserocr" if TESSEROCR_AVAILABLE else "pytesseract")
+if OCR_BACKEND == "tesserocr" and not TESSEROCR_AVAILABLE:
+    OCR_BACKEND = "pytesseract"
+if OCR_BACKEND == "tesserocr":
+    TESSERACT_AVAILABLE = True
+
+_backends: dict = {}
+
+
+def get_backend(name: Optional[str] = None):
+    """Экземпляр бэкенда (один на процесс)"""
+    name = name or OCR_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        backend = _backends[name] = OCR_BACKENDS[name]()
+    return backend
+
+
+# Пул потоков для блоков и полос: один на процесс и живёт между снимками, поэтому
+# хэндлы tesserocr (threading.local) в его потоках грузятся один раз.
+# В воркере ocr_executor создаётся в _init_worker (размер — с учётом числа воркеров)
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_thread_pool_pid = 0  # процесс, создавший пул (после fork потоки родителя недоступны)
+_thread_pool_lock = threading.Lock()
+
+
+def init_thread_pool(threads: int = OCR_BLOCK_THREADS, initializer=None) -> None:
+    """Создаёт пул потоков процесса; threads <= 1 — блоки и полосы читаются по очереди"""
+    global _thread_pool, _thread_pool_pid
+    with _thread_pool_lock:
+        if _thread_pool is not None and _thread_pool_pid == os.getpid():
+            _thread_pool.shutdown(wait=False)
+        _thread_pool = (
+            ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ocr", initializer=initializer)
+            if threads > 1 else None
+        )
+        _thread_pool_pid = os.getpid()
+
+
+def _get_thread_pool() -> Optional[ThreadPoolExecutor]:
+    """Пул потоков процесса (создаётся при первом обращении, в т.ч. после fork)"""
+    if _thread_pool_pid != os.getpid():
+        init_thread_pool()
+    return _thread_pool
+
+
+def ocr_config_signature() -> str:
+    """Строка, однозначно описывающая конфигурацию OCR (для ключа кэша)"""
+    scale_mode = f"xh{TARGET_X_HEIGHT}" if ADAPTIVE_SCALE else f"x{MAX_SCALE:g}"
+    if PREPROCESS_ENGINE == "pil":
+        scale_mode += f"-t{BINARY_THRESHOLD}"
+    return (
+        f"{PREPROCESS_VERSIONS[PREPROCESS_ENGINE]}-{scale_mode}-{OCR_LAYOUT}"
+        f"-tile{OCR_TILE_TRIGGER}/{OCR_TILE_HEIGHT}/{OCR_TILE_OVERLAP}|{OCR_BACKEND}"
+        f"|{OCR_LANG}|{TESSERACT_CONFIG}|garbage-{garbage_filter.digest}"
+        f"|{_escalation_signature()}"
+    )
+
+
+def _escalation_signature() -> str:
+    if not OCR_ESCALATION:
+        return "esc-off"
+    signature = f"esc-x{FAST_MAX_SCALE:g}-c{OCR_CONF_THRESHOLD:g}/{OCR_LINE_CONF_THRESHOLD:g}/{OCR_ESCALATE_MAX_LINES}"
+    if OCR_SCRIPT_DETECTION:
+        signature += f"-script{SCRIPT_SAMPLE_HEIGHT}/{SCRIPT_MIN_LETTERS}/{SCRIPT_MINOR_SHARE:g}"
+    return signature
+
+
+def line_config(config: Optional[str] = None) -> str:
+    """Конфиг Tesseract для одной строки (--psm 7)"""
+    config = config or TESSERACT_CONFIG
+    if re.search(r"--psm\s+\d+", config):
+        return re.sub(r"--psm\s+\d+", "--psm 7", config)
+    return f"{config} --psm 7"
+
+
+# Список мусора для постобработки (правила — в garbage_rules.txt)
+GARBAGE_PATTERNS = garbage_filter.rules
 
 
 def _crop_borders(img: Image.Image) -> Image.Image:
@@ -55,31 +330,627 @@ def _crop_borders(img: Image.Image) -> Image.Image:
     return img.crop((0, crop_top, width, crop_bottom))
 
 
-def _preprocess_image(img: Image.Image) -> Image.Image:
-    """Предобработка изображения для Tesseract"""
-    if img.mode != "RGB":
-        img = img.convert("RGB")
+def _estimate_x_height(gray: Image.Image, min_lines: int = 3) -> Optional[float]:
+    """
+    Оценивает x-height текста (px исходного изображения) по проекции строк.
+    Работает на уменьшенной копии: строки текста — это полосы строк пикселей
+    с «чернилами», разделённые пустыми промежутками.
+    """
+    factor = 2 if gray.width >= 800 else 1
+    small = gray.reduce(factor) if factor > 1 else gray
+    arr = np.asarray(small)
+    
+    # Тёмная тема: текст светлый на тёмном фоне
+    ink = arr > 128 if arr.mean() < 128 else arr < 128
+    row_ink = ink.mean(axis=1)
+    
+    # Строка с текстом: есть чернила, но не сплошная заливка (фото, плашки)
+    is_text = (row_ink > 0.002) & (row_ink < 0.35)
     
-    # Обрезаем кнопки
-    img = _crop_borders(img)
+    # Длины непрерывных полос текстовых строк
+    padded = np.concatenate(([False], is_text, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = edges[1::2] - edges[0::2]
+    runs = runs[(runs >= 3) & (runs <= 150 // factor)]
+    if len(runs) < min_lines:
+        return None
+    
+    # Полоса строки = выносные элементы + x-height; x-height ≈ 0.55 высоты полосы
+    return float(np.median(runs)) * factor * 0.55
+
+
+def _choose_scale(gray: Image.Image, min_lines: int = 3) -> float:
+    """Минимальный масштаб, при котором x-height достигает TARGET_X_HEIGHT"""
+    if not ADAPTIVE_SCALE:
+        return MAX_SCALE
+    x_height = _estimate_x_height(gray, min_lines)
+    if not x_height:
+        return MAX_SCALE
+    
+    # Шаг 0.25, без увеличения для high-DPI скриншотов
+    scale = math.ceil(TARGET_X_HEIGHT / x_height * 4) / 4
+    scale = min(MAX_SCALE, max(1.0, scale))
+    print(f"📏 x-height ≈ {x_height:.1f}px → scale x{scale:g}")
+    return scale
+
+
+def _preprocess_image_pil(img: Image.Image, scale: Optional[float] = None) -> Image.Image:
+    """Предобработка изображения для Tesseract (Pillow)"""
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
     
     # Серый
     img = ImageOps.grayscale(img)
     
-    # Увеличение x3
-    scale = 3
-    img = img.resize((img.width * scale, img.height * scale), Image.Resampling.LANCZOS)
+    # Увеличение (до x3, по размеру текста)
+    if scale is None:
+        scale = _choose_scale(img)
+    if scale != 1:
+        size = (round(img.width * scale), round(img.height * scale))
+        img = img.resize(size, Image.Resampling.LANCZOS)
     
     # Контраст + резкость
     img = ImageEnhance.Contrast(img).enhance(2.0)
     img = ImageEnhance.Sharpness(img).enhance(2.0)
     
     # Threshold
-    img = img.point(lambda x: 0 if x < 140 else 255, mode="1")
+    threshold = BINARY_THRESHOLD
+    img = img.point(lambda x: 0 if x < threshold else 255, mode="1")
     
     return img
 
 
+def _preprocess_image_cv(img: Image.Image, scale: Optional[float] = None) -> Image.Image:
+    """
+    Предобработка изображения для Tesseract (OpenCV/NumPy).
+    Тот же пайплайн, но на массивах: без промежуточных PIL-копий,
+    CLAHE вместо глобального контраста, Otsu вместо фиксированного порога.
+    """
+    img = img.convert("L")
+    if scale is None:
+        scale = _choose_scale(img)
+    gray = np.asarray(img)
+    
+    # Локальный контраст (до увеличения — в 9 раз меньше пикселей)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    gray = clahe.apply(gray)
+    
+    # Увеличение (до x3, по размеру текста)
+    if scale != 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    
+    # Резкость: unsharp mask, результат пишется в тот же массив
+    blur = cv2.GaussianBlur(gray, (0, 0), 1.0)
+    cv2.addWeighted(gray, 2.0, blur, -1.0, 0, dst=gray)
+    del blur
+    
+    # Threshold (Otsu, на месте)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=gray)
+    
+    return Image.fromarray(gray)
+
+
+def _preprocess_image(
+    img: Image.Image,
+    engine: Optional[str] = None,
+    scale: Optional[float] = None,
+    crop: bool = True,
+) -> Image.Image:
+    """Предобработка изображения для Tesseract выбранным движком"""
+    engine = engine or PREPROCESS_ENGINE
+    
+    # Обрезаем кнопки (до конвертаций — меньше пикселей)
+    if crop:
+        img = _crop_borders(img)
+    
+    if engine == "opencv" and OPENCV_AVAILABLE:
+        return _preprocess_image_cv(img, scale)
+    return _preprocess_image_pil(img, scale)
+
+
+# -----------------------------
+# Layout: блоки текста
+# -----------------------------
+
+def _merge_boxes(boxes: list, gap_y: int = 0) -> list:
+    """
+    Объединяет пересекающиеся прямоугольники (x0, y0, x1, y1).
+    gap_y — по вертикали объединяются и блоки, разделённые промежутком до gap_y.
+    """
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for i, other in enumerate(result):
+                if (box[0] < other[2] and other[0] < box[2]
+                        and box[1] - gap_y < other[3] and other[1] - gap_y < box[3]):
+                    result[i] = (
+                        min(box[0], other[0]), min(box[1], other[1]),
+                        max(box[2], other[2]), max(box[3], other[3]),
+                    )
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+
+def _reading_order(boxes: list) -> list:
+    """Сортировка блоков: сверху вниз, в одной «строке» блоков — слева направо"""
+    boxes = sorted(boxes, key=lambda b: b[1])
+    rows = []
+    for box in boxes:
+        if rows:
+            last = rows[-1]
+            top = min(b[1] for b in last)
+            bottom = max(b[3] for b in last)
+            overlap = min(bottom, box[3]) - max(top, box[1])
+            if overlap > 0.5 * min(bottom - top, box[3] - box[1]):
+                last.append(box)
+                continue
+        rows.append([box])
+    return [box for row in rows for box in sorted(row, key=lambda b: b[0])]
+
+
+def _find_text_blocks(img: Image.Image) -> list:
+    """
+    Ищет блоки текста на уменьшенной копии.
+    Морфологический градиент → Otsu → дилатация (слова в строки, строки в абзацы)
+    → внешние контуры. Фото и плашки без текста отбрасываются по доле фона.
+    Возвращает прямоугольники (x0, y0, x1, y1) в координатах исходного изображения
+    в порядке чтения.
+    """
+    gray = np.asarray(img.convert("L"))
+    h, w = gray.shape
+    factor = max(1.0, w / LAYOUT_WIDTH)
+    small = cv2.resize(gray, (round(w / factor), round(h / factor)), interpolation=cv2.INTER_AREA)
+    sh, sw = small.shape
+    
+    grad = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    _, bw = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 5))
+    connected = cv2.dilate(bw, kernel)
+    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    pad = 4
+    boxes = []
+    for contour in contours:
+        x, y, bw_, bh = cv2.boundingRect(contour)
+        if bw_ < 10 or bh < 6:
+            continue
+        
+        # Текст: преобладает один тон фона. Фото: много полутонов
+        patch = small[y:y + bh, x:x + bw_]
+        background = np.median(patch)
+        bg_ratio = np.count_nonzero(np.abs(patch.astype(np.int16) - background) < 30) / patch.size
+        if bg_ratio < 0.5:
+            continue
+        
+        boxes.append((
+            max(0, x - pad), max(0, y - pad),
+            min(sw, x + bw_ + pad), min(sh, y + bh + pad),
+        ))
+    
+    if not boxes:
+        return []
+    
+    # Соседние строки — в один абзац: меньше вызовов Tesseract
+    line_height = int(np.median([y1 - y0 for _, y0, _, y1 in boxes]))
+    boxes = _merge_boxes(boxes, gap_y=line_height)
+    boxes = [
+        (int(x0 * factor), int(y0 * factor), min(w, math.ceil(x1 * factor)), min(h, math.ceil(y1 * factor)))
+        for x0, y0, x1, y1 in boxes
+    ]
+    return _reading_order(boxes)
+
+
+# -----------------------------
+# Эскалация по уверенности
+# -----------------------------
+
+def _preprocess_fast(gray: Image.Image, scale: float) -> Image.Image:
+    """Дешёвая предобработка для первого прохода: серый, тёмный текст на светлом, без бинаризации"""
+    if ImageStat.Stat(gray).mean[0] < 128:
+        gray = ImageOps.invert(gray)
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+    if scale != 1:
+        size = (round(gray.width * scale), round(gray.height * scale))
+        gray = gray.resize(size, Image.Resampling.BILINEAR)
+    return gray
+
+
+def _group_lines(words: list) -> dict:
+    """Слова по строкам, в порядке Tesseract: {(block, par, line): [OCRWord, ...]}"""
+    lines: dict = {}
+    for word in words:
+        lines.setdefault(word.line, []).append(word)
+    return lines
+
+
+def _line_conf(words: list) -> float:
+    """Средняя уверенность строки, взвешенная по длине слов"""
+    chars = sum(len(w.text) for w in words)
+    return sum(w.conf * len(w.text) for w in words) / chars if chars else 0.0
+
+
+def _lines_to_text(lines: dict, texts: dict) -> str:
+    """Текст из строк; между абзацами — пустая строка, как у image_to_string"""
+    out = []
+    prev_par = None
+    for key in lines:
+        if prev_par is not None and key[:2] != prev_par:
+            out.append("")
+        out.append(texts[key])
+        prev_par = key[:2]
+    return "\n".join(out)
+
+
+def _deadline(timeout: float) -> float:
+    """Срок задачи по time.monotonic() (0 — без срока)"""
+    return time.monotonic() + timeout if timeout else 0
+
+
+def _time_left(deadline: float) -> float:
+    """
+    Таймаут очередного вызова Tesseract — остаток срока всей задачи, а не полный
+    таймаут на каждый блок/полосу. Срок вышел — TimeoutError (для tesserocr это
+    единственная проверка внутри воркера: вызовы после срока не начинаются).
+    """
+    if not deadline:
+        return 0
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("OCR job deadline exceeded")
+    return left
+
+
+def _ocr_region(
+    img: Image.Image,
+    backend,
+    deadline: float = 0,
+    crop: bool = True,
+    min_lines: int = 3,
+    passes: Optional[list] = None,
+    lang: Optional[str] = None,
+) -> str:
+    """
+    OCR фрагмента (кадра или блока) с эскалацией по уверенности:
+    - fast: серый без бинаризации, масштаб не больше x1.5 — если уверенность высокая, это всё
+    - fast+lines: плохие строки пересчитываются полной предобработкой (--psm 7)
+    - full: полная предобработка всего фрагмента (много плохих строк или пусто)
+    Выбранный проход добавляется в passes.
+    lang — модель для быстрого прохода (по образцу текста); эскалация всегда с OCR_LANG.
+    """
+    if crop:
+        img = _crop_borders(img)
+    gray = img.convert("L")
+    full_scale = _choose_scale(gray, min_lines)
+    
+    def full_pass() -> str:
+        if passes is not None:
+            passes.append("full")
+        img_prep = _preprocess_image(img, scale=full_scale, crop=False)
+        return backend.image_to_string(img_prep, OCR_LANG, TESSERACT_CONFIG, timeout=_time_left(deadline))
+    
+    if not OCR_ESCALATION:
+        return full_pass()
+    
+    fast_scale = min(FAST_MAX_SCALE, full_scale)
+    words = backend.image_to_data(
+        _preprocess_fast(gray, fast_scale), lang or OCR_LANG, TESSERACT_CONFIG, timeout=_time_left(deadline)
+    )
+    lines = _group_lines(words)
+    if not lines:
+        return full_pass()
+    
+    confs = {key: _line_conf(line_words) for key, line_words in lines.items()}
+    total_chars = sum(len(w.text) for w in words)
+    low = [key for key, conf in confs.items() if conf < OCR_LINE_CONF_THRESHOLD]
+    low_chars = sum(len(w.text) for key in low for w in lines[key])
+    mean_conf = sum(w.conf * len(w.text) for w in words) / total_chars
+    
+    texts = {key: " ".join(w.text for w in line_words) for key, line_words in lines.items()}
+    if not low and mean_conf >= OCR_CONF_THRESHOLD:
+        if passes is not None:
+            passes.append("fast")
+        return _lines_to_text(lines, texts)
+    
+    if not low or len(low) > OCR_ESCALATE_MAX_LINES or low_chars > total_chars / 2:
+        return full_pass()
+    
+    # Только плохие строки: вырезаем из исходного фрагмента и читаем по одной
+    config = line_config()
+    for key in low:
+        x0 = min(w.box[0] for w in lines[key]) / fast_scale
+        y0 = min(w.box[1] for w in lines[key]) / fast_scale
+        x1 = max(w.box[2] for w in lines[key]) / fast_scale
+        y1 = max(w.box[3] for w in lines[key]) / fast_scale
+        pad = max(4, (y1 - y0) * 0.25)
+        box = (
+            max(0, int(x0 - pad)), max(0, int(y0 - pad)),
+            min(img.width, math.ceil(x1 + pad)), min(img.height, math.ceil(y1 + pad)),
+        )
+        line_prep = _preprocess_image(img.crop(box), scale=full_scale, crop=False)
+        text = backend.image_to_string(line_prep, OCR_LANG, config, timeout=_time_left(deadline)).strip()
+        if text:
+            texts[key] = text
+    if passes is not None:
+        passes.append("fast+lines")
+    return _lines_to_text(lines, texts)
+
+
+def _ocr_blocks(
+    img: Image.Image,
+    boxes: list,
+    backend,
+    deadline: float = 0,
+    parallel: bool = True,
+    passes: Optional[list] = None,
+    lang: Optional[str] = None,
+) -> str:
+    """OCR блоков параллельно в пуле процесса (каждый в своём масштабе), текст — в порядке чтения"""
+    
+    def ocr_block(box) -> str:
+        block = img.crop(box)
+        return _ocr_region(
+            block, backend, deadline=deadline, crop=False, min_lines=1, passes=passes, lang=lang
+        ).strip()
+    
+    pool = _get_thread_pool() if parallel and len(boxes) > 1 else None
+    if pool is None:
+        texts = [ocr_block(box) for box in boxes]
+    else:
+        texts = list(pool.map(ocr_block, boxes))
+    return "\n".join(t for t in texts if t)
+
+
+def _ocr_frame(
+    img: Image.Image,
+    backend,
+    deadline: float = 0,
+    crop: bool = True,
+    parallel: bool = True,
+    passes: Optional[list] = None,
+    lang: Optional[str] = None,
+) -> str:
+    """OCR одного кадра: по блокам текста, запасной вариант — весь кадр"""
+    if OCR_LAYOUT == "blocks":
+        boxes = _find_text_blocks(img)
+        if boxes:
+            print(f"🧱 Found {len(boxes)} text blocks")
+            return _ocr_blocks(img, boxes, backend, deadline=deadline, parallel=parallel, passes=passes, lang=lang)
+    
+    # Запасной вариант: весь кадр без верхней/нижней полосы интерфейса
+    return _ocr_region(img, backend, deadline=deadline, crop=crop, passes=passes, lang=lang)
+
+
+# -----------------------------
+# Выбор языковой модели
+# -----------------------------
+
+def _count_scripts(text: str) -> tuple[int, int]:
+    """(кириллических букв, латинских букв)"""
+    cyrillic = latin = 0
+    for ch in text:
+        if "а" <= ch <= "я" or "А" <= ch <= "Я" or ch in "ёЁ":
+            cyrillic += 1
+        elif "a" <= ch <= "z" or "A" <= ch <= "Z":
+            latin += 1
+    return cyrillic, latin
+
+
+def choose_lang(text: str) -> str:
+    """Модель по образцу текста: rus, eng или OCR_LANG, если алфавиты смешаны"""
+    cyrillic, latin = _count_scripts(text)
+    letters = cyrillic + latin
+    if letters < SCRIPT_MIN_LETTERS:
+        return OCR_LANG
+    if latin / letters <= SCRIPT_MINOR_SHARE:
+        return SCRIPT_LANGS["cyrillic"]
+    if cyrillic / letters <= SCRIPT_MINOR_SHARE:
+        return SCRIPT_LANGS["latin"]
+    return OCR_LANG
+
+
+def _script_sample(gray: Image.Image) -> Image.Image:
+    """Полоса SCRIPT_SAMPLE_HEIGHT с наибольшим числом строк текста (без NumPy — середина кадра)"""
+    height = min(SCRIPT_SAMPLE_HEIGHT, gray.height)
+    top = (gray.height - height) // 2
+    if NUMPY_AVAILABLE and gray.height > height:
+        arr = np.asarray(gray)
+        ink = arr > 128 if arr.mean() < 128 else arr < 128
+        row_ink = ink.mean(axis=1)
+        is_text = ((row_ink > 0.002) & (row_ink < 0.35)).astype(np.int32)
+        window = np.convolve(is_text, np.ones(height, np.int32), mode="valid")
+        top = int(np.argmax(window))
+    return gray.crop((0, top, gray.width, top + height))
+
+
+def _detect_lang(gray: Image.Image, backend, deadline: float = 0) -> str:
+    """Быстрый проход OCR_LANG по образцу, затем выбор модели по доле алфавитов"""
+    sample = _preprocess_fast(_script_sample(gray), 1.0)
+    words = backend.image_to_data(sample, OCR_LANG, TESSERACT_CONFIG, timeout=_time_left(deadline))
+    # Неуверенные слова — часто шум, алфавит по ним не считаем
+    text = " ".join(w.text for w in words if w.conf >= OCR_LINE_CONF_THRESHOLD)
+    lang = choose_lang(text)
+    cyrillic, latin = _count_scripts(text)
+    print(f"🔤 Script sample: {cyrillic} cyrillic / {latin} latin letters → {lang}")
+    return lang
+
+
+# -----------------------------
+# Tiles: длинные скриншоты
+# -----------------------------
+
+def _tile_bounds(gray: Image.Image, tile_height: int, overlap: int) -> list:
+    """
+    Границы полос (top, bottom) с перекрытием overlap.
+    Если есть NumPy, границы сдвигаются на пустые строки пикселей,
+    чтобы не резать строки текста пополам.
+    """
+    height = gray.height
+    blank = None
+    if NUMPY_AVAILABLE:
+        arr = np.asarray(gray)
+        ink = arr > 128 if arr.mean() < 128 else arr < 128
+        blank = ink.mean(axis=1) < 0.002
+    
+    def snap(lo: int, hi: int, default: int) -> int:
+        """Последняя пустая строка в [lo, hi) или default"""
+        if blank is None or lo >= hi:
+            return default
+        idx = np.flatnonzero(blank[lo:hi])
+        return lo + int(idx[-1]) if len(idx) else default
+    
+    bounds = []
+    top = 0
+    while True:
+        if top + tile_height >= height:
+            bounds.append((top, height))
+            return bounds
+        nominal = top + tile_height
+        bottom = snap(nominal - overlap // 2, nominal, nominal)
+        bounds.append((top, bottom))
+        top = snap(bottom - overlap, bottom - overlap // 2, bottom - overlap)
+
+
+def _line_key(line: str) -> str:
+    """Нормализация строки для сравнения: только буквы и цифры, нижний регистр"""
+    return "".join(ch for ch in line.lower() if ch.isalnum())
+
+
+def _stitch_tiles(texts: list) -> str:
+    """Склеивает текст полос, убирая строки, повторённые в зоне перекрытия"""
+    # Полосы одного снимка: перекрытие — от одной строки, без пропуска строк у края
+    return stitch_texts(texts, edge_lines=0, min_overlap=1, separator="\n")
+
+
+def _ocr_tiles(
+    img: Image.Image, backend, deadline: float = 0, passes: Optional[list] = None, lang: Optional[str] = None
+) -> str:
+    """
+    OCR длинного скриншота полосами параллельно.
+    Память на предобработку ограничена размером полосы, а не высотой снимка.
+    """
+    gray = img.convert("L")
+    bounds = _tile_bounds(gray, OCR_TILE_HEIGHT, OCR_TILE_OVERLAP)
+    print(f"🧻 Tall image {gray.width}x{gray.height} → {len(bounds)} tiles")
+    
+    def ocr_tile(bound) -> str:
+        top, bottom = bound
+        strip = gray.crop((0, top, gray.width, bottom))
+        # Полосы уже идут в пуле: блоки внутри полосы — по очереди
+        return _ocr_frame(strip, backend, deadline=deadline, crop=False, parallel=False, passes=passes, lang=lang)
+    
+    pool = _get_thread_pool()
+    texts = list(pool.map(ocr_tile, bounds)) if pool is not None else [ocr_tile(b) for b in bounds]
+    return _stitch_tiles(texts)
+
+
+# -----------------------------
+# Key/value: таблица характеристик
+# -----------------------------
+
+def _group_rows(words: list) -> list:
+    """Слова по визуальным строкам (центр по вертикали внутри строки), каждая — слева направо"""
+    rows: list = []
+    for word in sorted(words, key=lambda w: (w.box[1] + w.box[3]) / 2):
+        center = (word.box[1] + word.box[3]) / 2
+        if rows:
+            row = rows[-1]
+            top = min(w.box[1] for w in row)
+            bottom = max(w.box[3] for w in row)
+            if top <= center <= bottom:
+                row.append(word)
+                continue
+        rows.append([word])
+    return [sorted(row, key=lambda w: w.box[0]) for row in rows]
+
+
+def _row_gap(row: list, width: int) -> Optional[tuple]:
+    """(левая часть, правая часть) по самому широкому промежутку строки; None — промежутка нет"""
+    if len(row) < 2:
+        return None
+    gap, index = max((b.box[0] - a.box[2], i) for i, (a, b) in enumerate(zip(row, row[1:]), 1))
+    if gap < KV_MIN_GUTTER * width:
+        return None
+    return row[:index], row[index:]
+
+
+def _column_split(rows: list, width: int) -> Optional[float]:
+    """
+    Левая граница колонки значений: по строкам с широким промежутком между словами
+    берётся начало правой части, граница — медиана минус высота строки.
+    None — таблицы нет.
+    """
+    starts, heights = [], []
+    for row in rows:
+        parts = _row_gap(row, width)
+        if parts:
+            right = parts[1][0]
+            starts.append(right.box[0])
+            heights.append(right.box[3] - right.box[1])
+    if len(starts) < 2:
+        return None
+    starts.sort()
+    heights.sort()
+    return starts[len(starts) // 2] - heights[len(heights) // 2]
+
+
+def _table_rows(rows: list, width: int, split: float) -> set:
+    """
+    Номера строк таблицы: не меньше KV_MIN_ROWS строк подряд, у которых промежуток
+    проходит по границе split (левая часть до неё, правая начинается сразу за ней).
+    Случайный промежуток в обычном тексте таблицей не считается.
+    """
+    aligned = []
+    for row in rows:
+        parts = _row_gap(row, width)
+        ok = False
+        if parts:
+            left, right = parts
+            start = right[0].box[0]
+            height = right[0].box[3] - right[0].box[1]
+            ok = left[-1].box[2] < split <= start <= split + 2 * height
+        aligned.append(ok)
+    
+    table = set()
+    run: list = []
+    for index, ok in enumerate(aligned + [False]):
+        if ok:
+            run.append(index)
+            continue
+        if len(run) >= KV_MIN_ROWS:
+            table.update(run)
+        run = []
+    return table
+
+
+def _extract_pairs(words: list, width: int) -> tuple[list, list]:
+    """
+    Строки текста и пары [название, значение] из слов image_to_data.
+    Пары — только из строк таблицы (_table_rows); строка таблицы в тексте — «название: значение».
+    """
+    rows = _group_rows(words)
+    split = _column_split(rows, width)
+    table = _table_rows(rows, width, split) if split is not None else set()
+    lines, pairs = [], []
+    for index, row in enumerate(rows):
+        if index not in table:
+            lines.append(" ".join(w.text for w in row))
+            continue
+        label = " ".join(w.text for w in row if w.box[0] < split).rstrip(":").strip()
+        value = " ".join(w.text for w in row if w.box[0] >= split).strip()
+        if label and value:
+            pairs.append([label, value])
+            lines.append(f"{label}: {value}")
+        else:
+            lines.append(label or value)
+    return lines, pairs
+
+
 def _clean_text(text: str) -> str:
     """Постобработка: убираем мусор"""
     lines = text.split('\n')
@@ -87,19 +958,12 @@ def _clean_text(text: str) -> str:
     
     for line in lines:
         line_stripped = line.strip()
-        line_lower = line_stripped.lower()
         
         if not line_stripped or len(line_stripped) <= 2:
             continue
         
-        # Проверяем на мусор
-        is_garbage = False
-        for pattern in GARBAGE_PATTERNS:
-            if re.search(pattern, line_lower, re.IGNORECASE):
-                is_garbage = True
-                break
-        
-        if not is_garbage:
+        # Проверяем на мусор (один скомпилированный регэксп на все правила)
+        if not garbage_filter.is_garbage(line_stripped):
             cleaned_lines.append(line_stripped)
     
     text = '\n'.join(cleaned_lines)
@@ -109,24 +973,38 @@ def _clean_text(text: str) -> str:
     return text.strip()
 
 
-def ocr_image_to_text(image_path: str) -> str:
+def ocr_image_to_text(image_path: str, timeout: float = 0) -> str:
     """
     Главная функция OCR.
     Использует Tesseract (быстро и стабильно).
+    timeout — лимит на всю задачу в секундах (0 — без лимита): вызовы Tesseract
+    делят его между собой (_time_left).
     """
     if not TESSERACT_AVAILABLE:
         print("❌ Tesseract not available!")
         return ""
     
     try:
-        print(f"🔍 Using Tesseract for {os.path.basename(image_path)}")
+        backend = get_backend()
+        print(f"🔍 Using Tesseract ({backend.name}) for {os.path.basename(image_path)}")
         
+        deadline = _deadline(timeout)
         img = Image.open(image_path)
-        img_prep = _preprocess_image(img)
+        passes: list = []
+        lang = None
+        if OCR_ESCALATION and OCR_SCRIPT_DETECTION:
+            lang = _detect_lang(_crop_borders(img).convert("L"), backend, deadline=deadline)
         
-        # Tesseract конфиг
-        config = "--oem 3 --psm 6"
-        text = pytesseract.image_to_string(img_prep, lang="rus+eng", config=config)
+        if img.height > OCR_TILE_TRIGGER:
+            text = _ocr_tiles(img, backend, deadline=deadline, passes=passes, lang=lang)
+        else:
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            text = _ocr_frame(img, backend, deadline=deadline, passes=passes, lang=lang)
+        
+        # Какой проход выбран (по фрагментам): fast / fast+lines / full
+        summary = ", ".join(f"{name}×{count}" for name, count in Counter(passes).most_common())
+        print(f"🎚️ OCR passes for {os.path.basename(image_path)}: {summary or 'none'}")
         
         # Чистим мусор
         text = _clean_text(text)
@@ -137,3 +1015,55 @@ def ocr_image_to_text(image_path: str) -> str:
     except Exception as e:
         print(f"❌ Tesseract failed: {e}")
         return ""
+
+
+def ocr_image_to_fields(image_path: str, timeout: float = 0) -> dict:
+    """
+    OCR в режиме таблицы: {"text": str, "pairs": [[название, значение], ...]}.
+    Пары собираются по координатам слов, парсер берёт из них поля без поиска регэкспами.
+    Длинные скриншоты — полосами, пары из зоны перекрытия не дублируются.
+    """
+    empty = {"text": "", "pairs": []}
+    if not TESSERACT_AVAILABLE:
+        print("❌ Tesseract not available!")
+        return empty
+    
+    try:
+        backend = get_backend()
+        print(f"🔍 Using Tesseract ({backend.name}, fields) for {os.path.basename(image_path)}")
+        
+        deadline = _deadline(timeout)
+        img = Image.open(image_path)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if img.height > OCR_TILE_TRIGGER:
+            bounds = _tile_bounds(img.convert("L"), OCR_TILE_HEIGHT, OCR_TILE_OVERLAP)
+            frames = [img.crop((0, top, img.width, bottom)) for top, bottom in bounds]
+        else:
+            frames = [_crop_borders(img)]
+        
+        texts, pairs = [], []
+        for frame in frames:
+            img_prep = _preprocess_image(frame, crop=False)
+            words = backend.image_to_data(img_prep, OCR_LANG, TESSERACT_CONFIG, timeout=_time_left(deadline))
+            frame_lines, frame_pairs = _extract_pairs(words, img_prep.width)
+            texts.append("\n".join(frame_lines))
+            pairs.extend(frame_pairs)
+        
+        text = _clean_text(_stitch_tiles(texts))
+        
+        seen = set()
+        unique_pairs = []
+        for label, value in pairs:
+            key = (_line_key(label), _line_key(value))
+            if key in seen or garbage_filter.is_garbage(f"{label} {value}"):
+                continue
+            seen.add(key)
+            unique_pairs.append([label, value])
+        
+        print(f"✅ Tesseract recognized {len(text)} chars, {len(unique_pairs)} key/value pairs")
+        return {"text": text, "pairs": unique_pairs}
+        
+    except Exception as e:
+        print(f"❌ Tesseract failed: {e}")
+        return empty
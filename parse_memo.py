@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Память результатов разбора описаний.
+Одно и то же описание часто разбирается несколько раз: повторная вставка после
+«Начать заново», дубль сообщения позже окна is_duplicate_message, одно объявление
+у нескольких менеджеров, повторный разбор того же текста альбома.
+
+- Ключ — sha256 текста с нормализованными пробелами: пробелы и табуляции внутри
+  строки схлопываются, строки обрезаются, пустые строки и \\r убираются.
+  Разбирается тоже нормализованный текст, поэтому у текстов с одним ключом
+  результат один и тот же
+- LRU на PARSE_MEMO_ITEMS записей, запись живёт PARSE_MEMO_TTL секунд
+- В памяти хранится копия результата и наружу отдаётся копия: правки карточки
+  в FSM не меняют сохранённый разбор
+
+Настройки (переменные окружения):
+- PARSE_MEMO_ITEMS — максимум записей (0 — отключить)
+- PARSE_MEMO_TTL   — время жизни записи, секунд (0 — без ограничения)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from parser import CarDescriptionParser, car_parser
+
+PARSE_MEMO_ITEMS = int(os.getenv("PARSE_MEMO_ITEMS", "256"))
+PARSE_MEMO_TTL = float(os.getenv("PARSE_MEMO_TTL", "3600"))
+
+_SPACES = re.compile(r'[^\S\n]+')
+
+
+def normalize_text(text: str) -> str:
+    """Текст без лишних пробелов: одна строка описания — одна строка без краевых пробелов"""
+    lines = (_SPACES.sub(' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def text_key(text: str) -> str:
+    """Ключ памяти: хэш нормализованного текста"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ParseMemo:
+    """
+    LRU/TTL-память перед CarDescriptionParser.parse (потокобезопасно).
+    parse_fields — напрямую в парсер: пары таблицы в ключ не входят.
+    """
+
+    def __init__(
+        self,
+        parser: CarDescriptionParser,
+        max_items: int = PARSE_MEMO_ITEMS,
+        ttl: float = PARSE_MEMO_TTL,
+    ):
+        self.parser = parser
+        self.max_items = max(0, max_items)
+        self.ttl = ttl
+
+        self._items: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()  # key -> (время записи, разбор)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._items[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key: str, parsed: Dict) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), parsed)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def parse(self, text: str) -> Dict:
+        """Разбор нормализованного текста; повтор — из памяти (копия)"""
+        text = normalize_text(text)
+        if not self.max_items:
+            return self.parser.parse(text)
+
+        key = text_key(text)
+        parsed = self._get(key)
+        if parsed is None:
+            parsed = self.parser.parse(text)
+            self._put(key, copy.deepcopy(parsed))
+            return parsed
+        return copy.deepcopy(parsed)
+
+    def parse_fields(self, fields: Dict) -> Dict:
+        return self.parser.parse_fields(fields)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "items": len(self._items),
+            }
+
+
+parse_memo = ParseMemo(car_parser)
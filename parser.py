@@ -4,204 +4,243 @@
 """
 Парсер описаний автомобилей с Авито
 ИСПРАВЛЕНИЯ:
-- Ищет название в конце текста тоже
+- Название — по словарю марок и моделей (car_models.txt), иначе по заглавным
+  словам в начале и в конце текста
 - Обрабатывает OCR ошибки (Зл → 3л)
-- Убирает дубли из спецификации
+- Убирает дубли из спецификации, в том числе почти одинаковые строки
+  с перекрывающихся скриншотов (spec_dedup, порог SPEC_DEDUP_THRESHOLD)
+- Разбирает пары «название | значение» из таблицы характеристик (OCR_MODE=fields)
+- Быстрый разбор: нижний регистр один раз, готовые шаблоны полей, автомат
+  ключевых слов и проходы по всему тексту для спецификации
+- Время разбора линейно по длине текста (шаблоны без катастрофического перебора)
+
+Настройки (переменные окружения):
+- PARSER_MAX_INPUT       — максимум символов текста, хвост отбрасывается (0 — без ограничения)
+- PARSER_TIME_BUDGET_MS  — бюджет времени на разбор спецификации одного текста,
+                           после него оставшиеся строки пропускаются (0 — без ограничения)
 """
 
+import os
 import re
-from typing import Dict, Optional, List
+import time
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, List
+
+from car_models import car_models, trie_pattern
+from garbage_filter import garbage_filter
+from spec_dedup import SpecDeduplicator, dedup_spec_items
+
+logger = logging.getLogger(__name__)
+
+PARSER_MAX_INPUT = int(os.getenv("PARSER_MAX_INPUT", "200000"))
+PARSER_TIME_BUDGET_MS = float(os.getenv("PARSER_TIME_BUDGET_MS", "500"))
 
 
 class CarDescriptionParser:
     """Парсер описаний автомобилей"""
     
-    def __init__(self):
-        # Словарь цветов
-        self.colors = {
-            'белый', 'чёрный', 'черный', 'серый', 'серебристый', 'серебряный',
-            'красный', 'синий', 'зелёный', 'зеленый', 'коричневый', 'бежевый',
-            'золотой', 'оранжевый', 'фиолетовый', 'жёлтый', 'желтый',
-            'бордовый', 'розовый', 'голубой', 'салатовый'
-        }
-        
-        # БЕЛЫЙ СПИСОК: допустимые ключевые слова
-        self.spec_keywords = [
-            # Двигатель
-            'двигател', 'объём', 'объем', 'тип двигател', 'мощность', 'л.с',
-            'цилиндр', 'конфигурац', 'рабочий объём', 'крутящий момент',
-            'оборот', 'максимальн',
-            
-            # Трансмиссия
-            'коробка', 'передач', 'привод', 'трансмисси',
-            
-            # Размеры
-            'длина', 'ширина', 'высота', 'база', 'колёсная база', 'колесная база',
-            'просвет', 'дорожный просвет', 'диаметр', 'разворот', 'колея',
-            'багажник', 'объём багажник', 'объем багажник',
-            
-            # Эксплуатационные
-            'расход', 'топлив', 'разгон', 'скорость', 'максимальная скорость',
-            'экологич', 'класс', 'ёмкость', 'емкость', 'бак', 'топливного бака',
-            'марка топлива',
-            
-            # Подвеска и тормоза
-            'подвеска', 'тормоз', 'передн', 'задн',
-            
-            # Шины и диски
-            'шины', 'диски', 'размерность', 'колёса', 'колеса', 'крепёж', 'pcd',
-            'центральное отверстие', 'dia',
-            
-            # Аккумулятор и масло
-            'аккумулятор', 'пусковой ток', 'полярность', 'моторное масло',
-            'sae', 'acea', 'api',
-            
-            # Кузов
-            'кузов', 'тип кузова', 'двер', 'количество двер',
-            
-            # Идентификация
-            'vin', 'птс', 'модификац', 'комплектац', 'рейтинг', 'euronсap',
-            'вариант модели', 'владельц', 'история',
-            
-            # Общее
-            'год', 'страна', 'цвет', 'руль', 'пробег', 'обмен'
-        ]
+    # Словарь цветов
+    COLORS = (
+        'белый', 'чёрный', 'черный', 'серый', 'серебристый', 'серебряный',
+        'красный', 'синий', 'зелёный', 'зеленый', 'коричневый', 'бежевый',
+        'золотой', 'оранжевый', 'фиолетовый', 'жёлтый', 'желтый',
+        'бордовый', 'розовый', 'голубой', 'салатовый'
+    )
+    
+    # БЕЛЫЙ СПИСОК: допустимые ключевые слова
+    SPEC_KEYWORDS = (
+        # Двигатель
+        'двигател', 'объём', 'объем', 'тип двигател', 'мощность', 'л.с',
+        'цилиндр', 'конфигурац', 'рабочий объём', 'крутящий момент',
+        'оборот', 'максимальн',
+
+        # Трансмиссия
+        'коробка', 'передач', 'привод', 'трансмисси',
+
+        # Размеры
+        'длина', 'ширина', 'высота', 'база', 'колёсная база', 'колесная база',
+        'просвет', 'дорожный просвет', 'диаметр', 'разворот', 'колея',
+        'багажник', 'объём багажник', 'объем багажник',
+
+        # Эксплуатационные
+        'расход', 'топлив', 'разгон', 'скорость', 'максимальная скорость',
+        'экологич', 'класс', 'ёмкость', 'емкость', 'бак', 'топливного бака',
+        'марка топлива',
+
+        # Подвеска и тормоза
+        'подвеска', 'тормоз', 'передн', 'задн',
+
+        # Шины и диски
+        'шины', 'диски', 'размерность', 'колёса', 'колеса', 'крепёж', 'pcd',
+        'центральное отверстие', 'dia',
+
+        # Аккумулятор и масло
+        'аккумулятор', 'пусковой ток', 'полярность', 'моторное масло',
+        'sae', 'acea', 'api',
+
+        # Кузов
+        'кузов', 'тип кузова', 'двер', 'количество двер',
+
+        # Идентификация
+        'vin', 'птс', 'модификац', 'комплектац', 'рейтинг', 'euronсap',
+        'вариант модели', 'владельц', 'история',
+
+        # Общее
+        'год', 'страна', 'цвет', 'руль', 'пробег', 'обмен'
+    )
+    
+    # Известные значения характеристик (строка с ключевым словом без числа)
+    KNOWN_VALUES = (
+        'полный', 'передний', 'задний', 'автомат', 'механика', 
+        'робот', 'вариатор', 'бензин', 'дизель', 'электро',
+        'независима', 'зависима', 'дисковые', 'барабанные',
+        'рядный', 'v-образный', 'euro', 'китай', 'германия',
+        'япония', 'россия', 'корея', 'сша', 'франция', 'швеция',
+        'пружинная', 'пневматическая', 'обратная', 'прямая',
+        'электронный', 'оригинал', 'дубликат'
+    )
+    
+    # Общие для всех экземпляров: разбор не меняет состояние парсера
+    colors = frozenset(COLORS)
+    spec_keywords = SPEC_KEYWORDS
+    
+    # -----------------------------
+    # Таблицы шаблонов: компилируются один раз при импорте модуля,
+    # не зависят от кэша re и общие для всех экземпляров (и потоков).
+    # Время поиска линейно по длине текста: повторы, за которыми идёт
+    # обязательный литерал, — possessive (*+, ++), а совпадения внутри
+    # серии цифр отсекаются lookbehind (начало левее дало бы то же совпадение).
+    # Без этого «1111…» или «двигатель 3      …» дают квадратичный
+    # и кубический перебор.
+    # -----------------------------
+    
+    # Основные поля (ищут по тексту в нижнем регистре)
+    _YEAR_LABEL = re.compile(r'год\s*+выпуска[:\s]++(\d{4})')
+    _YEAR_BARE = re.compile(r'\b(20[0-2]\d)\b')
+    _DRIVE = (
+        (re.compile(r'полн(?:ый|ая)'), "Полный"),
+        (re.compile(r'перед(?:ний|няя)'), "Передний"),
+        (re.compile(r'задн(?:ий|яя)'), "Задний"),
+    )
+    _POWER = re.compile(r'(?<!\d)(\d++)\s*+л\.?\s*+с')
+    _VOLUME_LABEL = re.compile(r'объ[её]м\s*+двигателя[:\s,]*+(\d++\.?+\d*+)\s*+л')
+    _VOLUME_ENGINE = re.compile(r'двигател[ьяе]*+\s*+([зЗ0-9]\s*+[.,]?+\s*+\d?+)\s*+л')
+    _VOLUME_BARE = re.compile(r'\b(\d{1,2}\.?\d?)\s*+л\b')
+    _VOLUME_CM3 = re.compile(r'рабочий\s*+объ[её]м[:\s]*+(\d++)\s*+см')
+    _FUEL = (('бензин', "Бензин"), ('дизел', "Дизель"), ('электр', "Электро"), ('гибрид', "Гибрид"))
+    _GEARBOX = (('автомат', "Автомат"), ('механик', "Механика"), ('робот', "Робот"), ('вариатор', "Вариатор"))
+    _COLOR_LABEL = re.compile(r'цвет[:\s]+([а-яё]+)', re.IGNORECASE)
+    _COLOR_WORDS = {
+        color: (re.compile(r'\b' + color + r'\b'), re.compile(r'\b' + color + r'\b', re.IGNORECASE))
+        for color in COLORS
+    }
+    _MILEAGE_LABEL = re.compile(r'пробег[:\s]++(\d++(?:[ \u00A0]\d++)*+)\s*+км')
+    # Число начинается не после цифры и не после «цифра + пробел» (его продолжение)
+    _MILEAGE_BARE = re.compile(r'(?<!\d)(?<!\d[ \u00A0])(\d++(?:[ \u00A0]\d++)*+)\s*+км(?!\s*/)')
+    
+    # Название
+    _TITLE_PRICE = re.compile(r'^\d+[\s\d]*[О0оo]*\s*₽?\s*')
+    _TITLE_PATTERNS = (
+        # Латиница: "Audi SQ5 Sportback"
+        re.compile(r'([A-Z][a-z]+(?:\s+[A-Z0-9][A-Za-z0-9]*)+(?:\s+[\d\.]+)?(?:\s+[A-Z]+)?)'),
+        # Кириллица
+        re.compile(r'([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ0-9][А-Яа-яё0-9]*)+)'),
+    )
+    _TITLE_YEAR = re.compile(r',?\s*+\d{4}\s*+$')
+    _TITLE_YEAR_END = re.compile(r',?\s*+\d{4}\s*+,?\s*+$')
+    _TITLE_GEARBOX = re.compile(r'\s++[AM]T\s*+,?\s*+$', re.IGNORECASE)
+    _TITLE_MILEAGE = re.compile(r',?\s*+\d++[\s\d]*+км.*$', re.IGNORECASE)
+    _TITLE_VOLUME = re.compile(r'\s+\d\.\d\s+')
+    
+    # Спецификация построчно (_is_valid_spec_item).
+    # Число с единицей: \d+[\s.,]*\d*\s*(км|л\.?с\.?|л|мм|м|c|см³|см|...) находится
+    # тогда и только тогда, когда есть «цифра, разделители, единица» из минимального
+    # набора (мм, км/ч, л.с… начинаются с м, к, л) — так без перебора разбиений числа
+    _UNITS = r'(?i:км|л|м|c|см|н\.?м|кг|а|об/мин)'
+    _SPEC_UNITS = re.compile(r'\d[\s.,]*+' + _UNITS)
+    _SPEC_TIRE = re.compile(r'\d{3}/\d{2}')
+    _SPEC_RIM = re.compile(r'\djx\d')
+    _SPEC_MARKER = re.compile(r'^[•\-\*]\s*')
+    
+    # Спецификация одним проходом: несколько сканов всего текста вместо проверок каждой строки.
+    # Каждое совпадение «съедает» остаток строки — на строку не больше одного попадания.
+    # Строка с числом+единицей (как _SPEC_UNITS, без перехода через \n), шинами, VIN
+    _SPEC_STRONG = re.compile(
+        r'(?:\d(?:(?:[^\S\n]|[.,])*+' + _UNITS + r'|jx\d|\d\d/\d\d)|vin)[^\n]*'
+    )
+    _SPEC_UPPER = re.compile(r'[A-Z]{4,}[^\n]*')
+    # Автомат ключевых слов: дерево префиксов SPEC_KEYWORDS
+    _SPEC_KEYWORD = re.compile('(?:' + trie_pattern(SPEC_KEYWORDS) + r')[^\n]*')
+    _KNOWN_VALUE = re.compile(trie_pattern(KNOWN_VALUES))
+    _DIGIT = re.compile(r'\d')
+    _SPEC_SKIP = re.compile('|'.join(re.escape(label) for label in (
+        'год выпуска:', 'пробег:', 'привод:', 'коробка передач:',
+        'цвет:', 'мощность, л.с:', 'объём двигателя,'
+    )))
     
     def _clean_title(self, text: str) -> Optional[str]:
-        """Извлекает название автомобиля (ищет в начале И в конце)"""
-        # Убираем цену из начала
-        text_clean = re.sub(r'^\d+[\s\d]*[О0оo]*\s*₽?\s*', '', text)
-        
-        # Паттерны названия
-        patterns = [
-            # Латиница: "Audi SQ5 Sportback"
-            r'([A-Z][a-z]+(?:\s+[A-Z0-9][A-Za-z0-9]*)+(?:\s+[\d\.]+)?(?:\s+[A-Z]+)?)',
-            # Кириллица
-            r'([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ0-9][А-Яа-яё0-9]*)+)',
-        ]
+        """
+        Извлекает название автомобиля: «марка модель» по словарю, иначе ищет
+        в начале И в конце, иначе марка из словаря в строке названия
+        """
+        found = car_models.find(text, make_only=False)
+        if found:
+            return found[1]
         
+        # Убираем цену из начала
+        text_clean = self._TITLE_PRICE.sub('', text)
+        return (
+            self._title_from_head(text_clean)
+            or self._title_from_tail(text_clean[-500:])
+            or self._title_from_make(text_clean)
+        )
+    
+    def _title_from_make(self, text_clean: str) -> Optional[str]:
+        """Только марка из словаря — если она в строке названия (первой непустой)"""
+        found = car_models.find(text_clean.lstrip().split('\n', 1)[0])
+        return found[1] if found else None
+    
+    def _title_from_head(self, text_clean: str) -> Optional[str]:
+        """Название в начале текста (цена уже убрана)"""
         # Приоритет 1: ищем в начале (первые 300 символов)
-        for pattern in patterns:
-            match = re.search(pattern, text_clean[:300])
+        for pattern in self._TITLE_PATTERNS:
+            match = pattern.search(text_clean[:300])
             if match:
                 title = match.group(1).strip()
                 # Убираем год, пробег
-                title = re.sub(r',?\s*\d{4}\s*$', '', title)
-                title = re.sub(r',?\s*\d+[\s\d]*км.*$', '', title, flags=re.IGNORECASE)
+                title = self._TITLE_YEAR.sub('', title)
+                title = self._TITLE_MILEAGE.sub('', title)
                 if len(title) > 3:
                     return title.strip()
-        
-        # Приоритет 2: ищем в конце (последние 500 символов)
+        return None
+    
+    def _title_from_tail(self, text_end: str) -> Optional[str]:
+        """Название в последних 500 символах текста"""
+        # Приоритет 2: ищем в конце
         # OCR часто дублирует название в конце
-        text_end = text_clean[-500:]
-        for pattern in patterns:
-            matches = list(re.finditer(pattern, text_end))
+        for pattern in self._TITLE_PATTERNS:
+            matches = list(pattern.finditer(text_end))
             if matches:
                 # Берём последнее совпадение
                 title = matches[-1].group(1).strip()
                 # Убираем год, AT/MT, пробег
-                title = re.sub(r',?\s*\d{4}\s*,?\s*$', '', title)
-                title = re.sub(r'\s+[AM]T\s*,?\s*$', '', title, flags=re.IGNORECASE)
-                title = re.sub(r',?\s*\d+[\s\d]*км.*$', '', title, flags=re.IGNORECASE)
+                title = self._TITLE_YEAR_END.sub('', title)
+                title = self._TITLE_GEARBOX.sub('', title)
+                title = self._TITLE_MILEAGE.sub('', title)
                 # Убираем объём двигателя из названия (2.0, 3.0 и тд)
-                title = re.sub(r'\s+\d\.\d\s+', ' ', title)
+                title = self._TITLE_VOLUME.sub(' ', title)
                 if len(title) > 3:
                     return title.strip()
         
         return None
     
-    def _extract_year(self, text: str) -> Optional[int]:
-        """Извлекает год выпуска"""
-        text_lower = text.lower()
-        
-        # Приоритет 1: "Год выпуска: 2021"
-        match = re.search(r'год\s*выпуска[:\s]+(\d{4})', text_lower)
-        if match:
-            return int(match.group(1))
-        
-        # Приоритет 2: год в начале/конце
-        matches = re.findall(r'\b(20[0-2]\d)\b', text)
-        if matches:
-            # Берём первый год в диапазоне 2000-2026
-            for year_str in matches:
-                year = int(year_str)
-                if 2000 <= year <= 2026:
-                    return year
-        
-        return None
-    
-    def _extract_drive(self, text: str) -> Optional[str]:
-        """Извлекает привод"""
-        text_lower = text.lower()
-        
-        if re.search(r'полн(ый|ая)', text_lower):
-            return "Полный"
-        if re.search(r'перед(ний|няя)', text_lower):
-            return "Передний"
-        if re.search(r'задн(ий|яя)', text_lower):
-            return "Задний"
-        
-        return None
-    
-    def _extract_engine(self, text: str) -> tuple[Optional[str], Optional[str]]:
-        """
-        Извлекает двигатель.
-        ОБРАБОТКА OCR ОШИБОК: "Зл" → "3л", "8л" может быть "3.8л"
-        """
-        text_lower = text.lower()
-        
-        # Ищем мощность (л.с.)
-        power_match = re.search(r'(\d+)\s*л\.?\s*с', text_lower)
-        power = int(power_match.group(1)) if power_match else None
-        
-        # Ищем объём
-        volume = None
-        
-        # Приоритет 1: "Объём двигателя: 3 л"
-        vol_match = re.search(r'объ[её]м\s*двигателя[:\s,]*(\d+\.?\d*)\s*л', text_lower)
-        if vol_match:
-            volume = float(vol_match.group(1))
-        
-        # Приоритет 2: "Двигатель 3л/ 354 л.с." или "Зл/ 354"
-        if not volume:
-            # OCR может распознать "3л" как "Зл" или "8л"
-            vol_match = re.search(r'двигател[ьяе]*\s*([зЗ0-9]\s*[.,]?\s*\d?)\s*л', text_lower)
-            if vol_match:
-                vol_str = vol_match.group(1)
-                # Исправляем OCR ошибки
-                vol_str = vol_str.replace('з', '3').replace('З', '3').replace(' ', '')
-                try:
-                    volume = float(vol_str.replace(',', '.'))
-                except:
-                    pass
-        
-        # Приоритет 3: "3.0л", "3л" в тексте
-        if not volume:
-            vol_match = re.search(r'\b(\d{1,2}\.?\d?)\s*л\b', text_lower)
-            if vol_match:
-                vol_candidate = float(vol_match.group(1))
-                if 0.6 <= vol_candidate <= 9.0:
-                    volume = vol_candidate
-        
-        # Приоритет 4: "Рабочий объём 2995 см³"
-        if not volume:
-            vol_match = re.search(r'рабочий\s*объ[её]м[:\s]*(\d+)\s*см', text_lower)
-            if vol_match:
-                cm3 = int(vol_match.group(1))
-                volume = round(cm3 / 1000, 1)  # см³ → литры
-        
-        # Тип топлива
-        fuel_type = None
-        if re.search(r'бензин', text_lower):
-            fuel_type = "Бензин"
-        elif re.search(r'дизел', text_lower):
-            fuel_type = "Дизель"
-        elif re.search(r'электр', text_lower):
-            fuel_type = "Электро"
-        elif re.search(r'гибрид', text_lower):
-            fuel_type = "Гибрид"
-        
-        # Формируем описание
+    @staticmethod
+    def _format_engine(power: Optional[int], volume: Optional[float], fuel_type: Optional[str]) -> Optional[str]:
+        """Описание двигателя: 354 л.с., 3л, Бензин"""
         parts = []
         if power:
             parts.append(f"{power} л.с.")
@@ -209,75 +248,7 @@ class CarDescriptionParser:
             parts.append(f"{volume:.1f}л".replace('.0', ''))
         if fuel_type:
             parts.append(fuel_type)
-        
-        engine_short = ", ".join(parts) if parts else None
-        return engine_short, engine_short
-    
-    def _extract_gearbox(self, text: str) -> Optional[str]:
-        """Извлекает коробку передач"""
-        text_lower = text.lower()
-        
-        if re.search(r'автомат', text_lower):
-            return "Автомат"
-        if re.search(r'механик', text_lower):
-            return "Механика"
-        if re.search(r'робот', text_lower):
-            return "Робот"
-        if re.search(r'вариатор', text_lower):
-            return "Вариатор"
-        
-        return None
-    
-    def _extract_color(self, text: str) -> Optional[str]:
-        """Извлекает цвет"""
-        text_lower = text.lower()
-        original_text = text
-        
-        # Приоритет 1: "Цвет: Чёрный"
-        color_match = re.search(r'цвет[:\s]+([а-яё]+)', text_lower, re.IGNORECASE)
-        if color_match:
-            color_word = color_match.group(1).lower()
-            if color_word in self.colors:
-                return color_word.capitalize()
-        
-        # Приоритет 2: поиск цвета как целого слова
-        for color in self.colors:
-            if re.search(r'\b' + color + r'\b', text_lower):
-                match = re.search(r'\b' + color + r'\b', text_lower, re.IGNORECASE)
-                if match:
-                    start = match.start()
-                    end = match.end()
-                    return original_text[start:end].capitalize()
-        
-        return None
-    
-    def _extract_mileage(self, text: str) -> Optional[int]:
-        """Извлекает пробег"""
-        text_lower = text.lower()
-        
-        # Приоритет 1: "Пробег 29 800 км" (с пробелами в числе)
-        match = re.search(r'пробег[:\s]+(\d+(?:[\s\u00A0]\d+)*)\s*км', text_lower)
-        if match:
-            mileage_str = match.group(1).replace(' ', '').replace('\u00A0', '')
-            return int(mileage_str)
-        
-        # Приоритет 2: просто число + км (но не маленькие числа типа "100 км/ч")
-        matches = re.findall(r'(\d+(?:[\s\u00A0]\d+)*)\s*км(?!\s*/)', text_lower)
-        if matches:
-            # Берём самое большое число (это скорее всего пробег)
-            mileages = []
-            for m in matches:
-                mileage_str = m.replace(' ', '').replace('\u00A0', '')
-                try:
-                    val = int(mileage_str)
-                    if 0 <= val <= 1000000:
-                        mileages.append(val)
-                except:
-                    pass
-            if mileages:
-                return max(mileages)
-        
-        return None
+        return ", ".join(parts) if parts else None
     
     def _is_valid_spec_item(self, line: str) -> bool:
         """
@@ -289,16 +260,15 @@ class CarDescriptionParser:
             return False
         
         # Есть число с единицей? → валидно
-        units_pattern = r'\d+[\s\.,]*\d*\s*(км|л\.?с\.?|л|мм|м|c|см³|см|н\.?м|кг|км/ч|л/100\s*км|ач|а|об/мин)'
-        if re.search(units_pattern, line_lower, re.IGNORECASE):
+        if self._SPEC_UNITS.search(line_lower):
             return True
         
         # Формат шин/дисков? → валидно
-        if re.search(r'\d{3}/\d{2}', line) or re.search(r'\d+jx\d+', line_lower):
+        if self._SPEC_TIRE.search(line) or self._SPEC_RIM.search(line_lower):
             return True
         
         # VIN? → валидно
-        if 'vin' in line_lower or re.search(r'[A-Z]{4,}', line):
+        if 'vin' in line_lower or self._SPEC_UPPER.search(line):
             return True
         
         # Есть ключевое слово?
@@ -312,20 +282,11 @@ class CarDescriptionParser:
                     return True
             
             # Есть число?
-            if re.search(r'\d+', line):
+            if self._DIGIT.search(line):
                 return True
             
             # Есть известные значения?
-            known_values = [
-                'полный', 'передний', 'задний', 'автомат', 'механика', 
-                'робот', 'вариатор', 'бензин', 'дизель', 'электро',
-                'независима', 'зависима', 'дисковые', 'барабанные',
-                'рядный', 'v-образный', 'euro', 'китай', 'германия',
-                'япония', 'россия', 'корея', 'сша', 'франция', 'швеция',
-                'пружинная', 'пневматическая', 'обратная', 'прямая',
-                'электронный', 'оригинал', 'дубликат'
-            ]
-            if any(val in line_lower for val in known_values):
+            if any(val in line_lower for val in self.KNOWN_VALUES):
                 return True
             
             # Строка длинная?
@@ -336,68 +297,603 @@ class CarDescriptionParser:
         
         return False
     
-    def _extract_spec_items(self, text: str) -> List[str]:
+    # -----------------------------
+    # Быстрый разбор
+    # -----------------------------
+    
+    @staticmethod
+    def _lower(text: str) -> str:
         """
-        Извлекает спецификацию.
-        УБИРАЕТ ДУБЛИ!
+        Нижний регистр той же длины, что и текст: позиции совпадений в нём годятся
+        для исходного текста. Длиннее после lower() становится только 'İ' (→ 'i̇'),
+        она читается как 'i' (OCR путает I и İ: «VİN»).
         """
-        lines = text.split('\n')
-        spec_items = []
-        seen = set()  # Для отслеживания дублей
+        text_lower = text.lower()
+        if len(text_lower) != len(text):
+            text_lower = text.replace('İ', 'i').lower()
+        return text_lower
+    
+    def _scan_fields(self, text: str, text_lower: Optional[str] = None) -> Dict:
+        """Основные поля: нижний регистр — один раз, шаблоны — готовые"""
+        if text_lower is None:
+            text_lower = self._lower(text)
+        
+        ranked = self._rank_fields(text, text_lower)
+        value = {name: ranked[name][1] if name in ranked else None for name in self.RANKED_FIELDS}
+        engine_short = self._format_engine(value['power'], value['volume'], value['fuel'])
+        return {
+            'title': self._clean_title(text),
+            'year': value['year'],
+            'drive': value['drive'],
+            'engine_short': engine_short,
+            'engine_full': engine_short,
+            'gearbox': value['gearbox'],
+            'color': value['color'],
+            'mileage_km': value['mileage_km'],
+        }
+    
+    # Поля, которые _rank_fields отдаёт с рангом
+    RANKED_FIELDS = ('year', 'drive', 'power', 'volume', 'fuel', 'gearbox', 'color', 'mileage_km')
+    
+    def _volume_stages(self, text_lower: str, every: bool = False) -> Dict[int, Optional[float]]:
+        """
+        Первое совпадение каждого шаблона объёма по порядку важности: {ранг: значение}.
+        None — совпадение негодное (не число, вне 0.6–9 л): следующие совпадения того же
+        шаблона не проверяются. После первого ненулевого значения остальные шаблоны
+        не проверяются, если не задан every (части текста в ParseSession).
+        """
+        stages: Dict[int, Optional[float]] = {}
+        match = self._VOLUME_LABEL.search(text_lower)
+        if match:
+            stages[0] = float(match.group(1))
+            if stages[0] and not every:
+                return stages
+        match = self._VOLUME_ENGINE.search(text_lower)
+        if match:
+            vol_str = match.group(1).replace('з', '3').replace('З', '3').replace(' ', '')
+            try:
+                stages[1] = float(vol_str.replace(',', '.'))
+            except ValueError:
+                stages[1] = None
+            if stages[1] and not every:
+                return stages
+        match = self._VOLUME_BARE.search(text_lower)
+        if match:
+            vol_candidate = float(match.group(1))
+            stages[2] = vol_candidate if 0.6 <= vol_candidate <= 9.0 else None
+            if stages[2] and not every:
+                return stages
+        match = self._VOLUME_CM3.search(text_lower)
+        if match:
+            stages[3] = round(int(match.group(1)) / 1000, 1)
+        return stages
+    
+    @staticmethod
+    def _pick_volume(stages: Dict[int, Optional[float]]) -> Optional[tuple]:
+        """Объём с рангом: первый шаблон с ненулевым значением, иначе последний с нулём"""
+        volume = None
+        for rank in sorted(stages):
+            value = stages[rank]
+            if value is not None and (volume is None or not volume[1]):
+                volume = (rank, value)
+        return volume
+    
+    def _color_word(self, text: str, text_lower: str) -> Optional[tuple]:
+        """Первое слово-цвет в порядке self.colors с рангом (индекс цвета + 1)"""
+        for rank, name in enumerate(self.colors, 1):
+            # Поиск подстроки дешевле регэкспа: большинство цветов в тексте не встречается
+            if name in text_lower:
+                word, word_anycase = self._COLOR_WORDS[name]
+                if word.search(text_lower):
+                    match = word_anycase.search(text_lower)
+                    return (rank, text[match.start():match.end()].capitalize())
+        return None
+    
+    def _rank_fields(self, text: str, text_lower: str) -> Dict[str, tuple]:
+        """
+        Найденные поля с рангом приоритета: {поле: (ранг, значение)}, меньший ранг важнее
+        (метка «Год выпуска:» важнее года в тексте и т.п.). Ранги позволяют сливать
+        результаты частей текста (ParseSession) так же, как их выбрал бы разбор целого.
+        Объём и метку цвета решает первое совпадение шаблона во всём тексте, даже негодное
+        (объём 0, метка не цвет) — их ParseSession сливает отдельно.
+        """
+        ranked: Dict[str, tuple] = {}
+        
+        # Год
+        match = self._YEAR_LABEL.search(text_lower)
+        if match:
+            ranked['year'] = (0, int(match.group(1)))
+        else:
+            for match in self._YEAR_BARE.finditer(text_lower):
+                if 2000 <= int(match.group(1)) <= 2026:
+                    ranked['year'] = (1, int(match.group(1)))
+                    break
+        
+        # Привод
+        for rank, (pattern, value) in enumerate(self._DRIVE):
+            if pattern.search(text_lower):
+                ranked['drive'] = (rank, value)
+                break
+        
+        # Двигатель
+        match = self._POWER.search(text_lower)
+        if match:
+            ranked['power'] = (0, int(match.group(1)))
+        
+        volume = self._pick_volume(self._volume_stages(text_lower))
+        if volume:
+            ranked['volume'] = volume
+        
+        for rank, (stem, value) in enumerate(self._FUEL):
+            if stem in text_lower:
+                ranked['fuel'] = (rank, value)
+                break
+        
+        # Коробка
+        for rank, (stem, value) in enumerate(self._GEARBOX):
+            if stem in text_lower:
+                ranked['gearbox'] = (rank, value)
+                break
+        
+        # Цвет: "Цвет: ...", затем первое слово-цвет в порядке self.colors
+        match = self._COLOR_LABEL.search(text_lower)
+        if match and match.group(1).lower() in self.colors:
+            ranked['color'] = (0, match.group(1).lower().capitalize())
+        else:
+            color = self._color_word(text, text_lower)
+            if color:
+                ranked['color'] = color
+        
+        # Пробег: по метке, иначе наибольшее «число км» (ранг 1 сливается через max)
+        match = self._MILEAGE_LABEL.search(text_lower)
+        if match:
+            ranked['mileage_km'] = (0, int(match.group(1).replace(' ', '').replace('\u00A0', '')))
+        else:
+            mileages = []
+            for m in self._MILEAGE_BARE.findall(text_lower):
+                try:
+                    val = int(m.replace(' ', '').replace('\u00A0', ''))
+                except ValueError:
+                    continue
+                if 0 <= val <= 1000000:
+                    mileages.append(val)
+            if mileages:
+                ranked['mileage_km'] = (1, max(mileages))
         
-        for line in lines:
-            line = line.strip()
+        return ranked
+    
+    def _scan_spec_items(
+        self, text: str, text_lower: Optional[str] = None, deadline: Optional[float] = None
+    ) -> List[str]:
+        """
+        Спецификация построчно, как _is_valid_spec_item, без повторов.
+        Строки-кандидаты находятся проходами по всему тексту, в Python
+        разбираются только они — остальные строки не могут быть пунктом.
+        deadline (time.perf_counter) — после него оставшиеся кандидаты пропускаются.
+        """
+        if text_lower is None:
+            text_lower = self._lower(text)
+        
+        # Начало строки → валидна сразу (число с единицей, шины, VIN, АББРЕВИАТУРА)
+        # или только при дополнительных условиях (ключевое слово)
+        candidates: Dict[int, bool] = {}
+        for m in self._SPEC_STRONG.finditer(text_lower):
+            candidates[text_lower.rfind('\n', 0, m.start()) + 1] = True
+        for m in self._SPEC_UPPER.finditer(text):
+            candidates[text.rfind('\n', 0, m.start()) + 1] = True
+        for m in self._SPEC_KEYWORD.finditer(text_lower):
+            candidates.setdefault(text_lower.rfind('\n', 0, m.start()) + 1, False)
+        
+        spec_items = []
+        seen = set()
+        for i, start in enumerate(sorted(candidates)):
+            if deadline is not None and i % 256 == 0 and time.perf_counter() > deadline:
+                logger.warning(f"Spec parsing over time budget: skipped {len(candidates) - i} of {len(candidates)} lines")
+                break
+            end = text.find('\n', start)
+            line = text[start:end if end >= 0 else len(text)].strip()
             
-            # Убираем маркеры
-            line = re.sub(r'^[•\-\*]\s*', '', line)
+            # Убираем маркер
+            if line and line[0] in '•-*':
+                line = line[1:].lstrip()
             
-            if not line:
+            line_lower = line.lower()
+            if len(line_lower) < 3:
                 continue
             
-            # Проверяем валидность
-            if not self._is_valid_spec_item(line):
-                continue
+            if not candidates[start]:
+                ok = (
+                    (':' in line and line.split(':', 1)[1].strip())
+                    or self._DIGIT.search(line)
+                    or self._KNOWN_VALUE.search(line_lower)
+                    or len(line) > 25
+                )
+                if not ok:
+                    continue
             
-            # Пропускаем основные поля
-            line_lower = line.lower()
-            skip_keywords = [
-                'год выпуска:', 'пробег:', 'привод:', 'коробка передач:',
-                'цвет:', 'мощность, л.с:', 'объём двигателя,'
-            ]
-            if any(keyword in line_lower for keyword in skip_keywords):
+            if self._SPEC_SKIP.search(line_lower):
                 continue
             
-            # ПРОВЕРКА НА ДУБЛЬ (нормализуем для сравнения)
             normalized = line_lower.replace(' ', '').replace(':', '')
             if normalized in seen:
                 continue
-            
             seen.add(normalized)
             spec_items.append(line)
         
         return spec_items
     
-    def parse(self, text: str) -> Dict:
-        """Парсит текст и возвращает структурированные данные"""
-        text = text.strip()
-        
-        title = self._clean_title(text)
-        year = self._extract_year(text)
-        drive = self._extract_drive(text)
-        engine_short, engine_full = self._extract_engine(text)
-        gearbox = self._extract_gearbox(text)
-        color = self._extract_color(text)
-        mileage = self._extract_mileage(text)
-        spec_items = self._extract_spec_items(text)
+    # -----------------------------
+    # Таблица характеристик (пары из OCR)
+    # -----------------------------
+    
+    # Начало названия строки таблицы → поле (порядок важен: длинные раньше коротких)
+    LABEL_FIELDS = (
+        ('год выпуска', 'year'),
+        ('пробег', 'mileage_km'),
+        ('привод', 'drive'),
+        ('коробка', 'gearbox'),
+        ('трансмиссия', 'gearbox'),
+        ('цвет', 'color'),
+        ('объём двигателя', 'volume'),
+        ('объем двигателя', 'volume'),
+        ('мощность', 'power'),
+        ('тип двигателя', 'fuel'),
+    )
+    
+    DRIVE_VALUES = (('полн', 'Полный'), ('перед', 'Передний'), ('задн', 'Задний'))
+    GEARBOX_VALUES = (('автомат', 'Автомат'), ('механ', 'Механика'), ('робот', 'Робот'), ('вариатор', 'Вариатор'))
+    FUEL_VALUES = (('бензин', 'Бензин'), ('дизел', 'Дизель'), ('электр', 'Электро'), ('гибрид', 'Гибрид'))
+    
+    @staticmethod
+    def _digits(value: str) -> Optional[int]:
+        digits = "".join(ch for ch in value if ch.isdecimal())
+        return int(digits) if digits else None
+    
+    @staticmethod
+    def _first_number(value: str) -> Optional[float]:
+        """Первое число в значении: "2,5 л" → 2.5"""
+        number = ""
+        for ch in value.replace(',', '.'):
+            if ch.isdecimal() or (ch == '.' and number and '.' not in number):
+                number += ch
+            elif number:
+                break
+        try:
+            return float(number.rstrip('.')) if number else None
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _lookup(value: str, table: tuple) -> Optional[str]:
+        value_lower = value.lower()
+        for prefix, result in table:
+            if prefix in value_lower:
+                return result
+        return None
+    
+    def _label_field(self, label: str) -> Optional[str]:
+        label_lower = label.lower().strip()
+        for prefix, name in self.LABEL_FIELDS:
+            if label_lower.startswith(prefix):
+                return name
+        return None
+    
+    def _pair_value(self, name: str, value: str):
+        """Значение поля из ячейки таблицы (None — не распознано)"""
+        if name == 'year':
+            year = self._digits(value)
+            return year if year and 1950 <= year <= 2030 else None
+        if name == 'mileage_km':
+            mileage = self._digits(value)
+            return mileage if mileage is not None and mileage <= 10_000_000 else None
+        if name == 'drive':
+            return self._lookup(value, self.DRIVE_VALUES)
+        if name == 'gearbox':
+            return self._lookup(value, self.GEARBOX_VALUES)
+        if name == 'fuel':
+            return self._lookup(value, self.FUEL_VALUES)
+        if name == 'color':
+            words = value.lower().split()
+            return words[0].capitalize() if words and words[0] in self.colors else None
+        if name == 'power':
+            power = self._first_number(value)
+            return int(power) if power else None
+        if name == 'volume':
+            volume = self._first_number(value)
+            if volume and volume > 100:
+                volume = round(volume / 1000, 1)  # см³ → литры
+            return volume if volume and 0.6 <= volume <= 9.0 else None
+        return None
+    
+    def parse_fields(self, fields: Dict) -> Dict:
+        """
+        Разбор результата OCR в режиме таблицы: {"text": str, "pairs": [[название, значение], ...]}.
+        Основные поля берутся из пар по названию строки; чего нет в таблице —
+        ищется в тексте как в parse(). Остальные пары идут в спецификацию, если проходят
+        проверку строки спецификации (_is_valid_spec_item) и фильтр мусора.
+        """
+        deadline = self._deadline()
+        text = self._limit_input(fields.get('text', '').strip())
+        pairs = fields.get('pairs') or []
+        
+        found: Dict = {}
+        pair_items = []
+        pair_lines = set()
+        for label, value in pairs:
+            item = f"{label}: {value}"
+            pair_lines.add(item)
+            name = self._label_field(label)
+            if name is not None:
+                parsed_value = self._pair_value(name, value)
+                if parsed_value is not None:
+                    found.setdefault(name, parsed_value)
+                # Строки двигателя остаются и в спецификации (как в parse())
+                if name not in ('power', 'volume', 'fuel'):
+                    continue
+            # В спецификацию — по тем же правилам, что и строки текста
+            if self._is_valid_spec_item(item) and not garbage_filter.is_garbage(item):
+                pair_items.append(item)
+        
+        # Поля, которых нет в таблице, — из текста
+        base = self._scan_fields(text)
+        year = found.get('year') or base['year']
+        drive = found.get('drive') or base['drive']
+        gearbox = found.get('gearbox') or base['gearbox']
+        color = found.get('color') or base['color']
+        mileage = found.get('mileage_km')
+        if mileage is None:
+            mileage = base['mileage_km']
+        
+        if {'power', 'volume', 'fuel'} & found.keys():
+            engine_short = self._format_engine(found.get('power'), found.get('volume'), found.get('fuel'))
+        else:
+            engine_short = base['engine_short']
+        
+        # Спецификация: пары таблицы + строки вне таблицы
+        free_text = "\n".join(line for line in text.split('\n') if line.strip() not in pair_lines)
+        spec_items = []
+        seen = set()
+        for item in pair_items + self._scan_spec_items(free_text, deadline=deadline):
+            normalized = item.lower().replace(' ', '').replace(':', '')
+            if normalized not in seen:
+                seen.add(normalized)
+                spec_items.append(item)
         
         return {
-            'title': title,
+            'title': base['title'],
             'year': year,
             'drive': drive,
             'engine_short': engine_short,
-            'engine_full': engine_full,
+            'engine_full': engine_short,
             'gearbox': gearbox,
             'color': color,
             'mileage_km': mileage,
-            'spec_items': spec_items,
+            'spec_items': dedup_spec_items(spec_items),
+        }
+    
+    @staticmethod
+    def _limit_input(text: str) -> str:
+        """Текст длиннее PARSER_MAX_INPUT обрезается по последней целой строке"""
+        if not PARSER_MAX_INPUT or len(text) <= PARSER_MAX_INPUT:
+            return text
+        cut = text.rfind('\n', 0, PARSER_MAX_INPUT)
+        logger.warning(f"Parser input truncated: {len(text)} > {PARSER_MAX_INPUT} chars")
+        return text[:cut if cut > 0 else PARSER_MAX_INPUT]
+    
+    @staticmethod
+    def _deadline() -> Optional[float]:
+        if not PARSER_TIME_BUDGET_MS:
+            return None
+        return time.perf_counter() + PARSER_TIME_BUDGET_MS / 1000
+    
+    def session(self) -> "ParseSession":
+        """Разбор текста, приходящего частями (см. ParseSession)"""
+        return ParseSession(self)
+    
+    def parse(self, text: str) -> Dict:
+        """Парсит текст и возвращает структурированные данные"""
+        deadline = self._deadline()
+        text = self._limit_input(text.strip())
+        text_lower = self._lower(text)
+        parsed = self._scan_fields(text, text_lower)
+        parsed['spec_items'] = dedup_spec_items(self._scan_spec_items(text, text_lower, deadline))
+        return parsed
+    
+    # Текст для прогрева: задевает все ветки parse() и parse_fields()
+    WARM_UP_TEXT = (
+        "Audi SQ5 Sportback 3.0 AT, 2021, 29 800 км\n"
+        "Год выпуска: 2021\nПробег: 29 800 км\nПривод: полный\n"
+        "Коробка передач: автомат\nЦвет: чёрный\n"
+        "Двигатель 3л/ 354 л.с., бензин\nРабочий объём 2995 см³\n"
+        "• Шины 255/45 R20, диски 9Jx20\n- Подвеска: пневматическая\nVIN WAUZZZ\n"
+        "Ауди Ку5 Спортбэк"
+    )
+    
+    def warm_up(self) -> None:
+        """
+        Прогрев при старте процесса: первый разбор не платит за холодные
+        пути (ленивые структуры sre, первые вызовы str-методов на кириллице).
+        """
+        self.parse(self.WARM_UP_TEXT)
+        self.parse_fields({
+            "text": self.WARM_UP_TEXT,
+            "pairs": [["Год выпуска", "2021"], ["Объём двигателя", "3 л"], ["Мощность", "354 л.с."]],
+        })
+    
+    def _parse_safe(self, text: str) -> Dict:
+        """Разбор одной записи потока: ошибка → {'error': ...} вместо исключения"""
+        try:
+            return self.parse(text)
+        except Exception as e:
+            logger.warning(f"Parse failed: {e!r}")
+            return {'error': f"{type(e).__name__}: {e}"}
+    
+    def _parse_chunk(self, texts: List[str]) -> List[Dict]:
+        """Задача процесса пула: пачка текстов за один обмен с родителем"""
+        return [self._parse_safe(text) for text in texts]
+    
+    def parse_many(self, texts: Iterable[str], workers: int = 1, chunk_size: int = 256) -> Iterator[Dict]:
+        """
+        Разбор потока текстов; результаты — в порядке входа.
+        Ошибка в одном тексте не прерывает поток: вместо разбора —
+        {'error': 'Тип: сообщение'}.
+        workers > 1 — пул процессов (fork): тексты уходят пачками по chunk_size,
+        в работе не больше workers * 2 пачек, так что вход читается по мере разбора,
+        а не целиком в память.
+        """
+        if workers <= 1:
+            for text in texts:
+                yield self._parse_safe(text)
+            return
+        
+        source = iter(texts)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=self.warm_up,
+        ) as pool:
+            pending: deque = deque()
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = list(islice(source, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(self._parse_chunk, chunk))
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+
+
+class ParseSession:
+    """
+    Разбор текста, который приходит частями (длинная вставка, разбитая Telegram
+    на несколько сообщений). Каждая часть разбирается один раз: поля сливаются
+    по рангу (_rank_fields), спецификация — с общей проверкой дублей (точных
+    и нечётких, SpecDeduplicator), «марка модель» по словарю — первая найденная,
+    для запасного поиска названия хранятся только начало и конец текста. Весь текст заново не разбирается.
+    Граница частей считается переводом строки. Значение, разорванное границей
+    («354» / «л.с.», «29 800» / «км»), ищется в стыке: последние BOUNDARY_LINES
+    строк прошлой части + первые BOUNDARY_LINES строк новой. Совпадение с parse
+    всего текста — пока значение укладывается в стык; шаблон, захватывающий
+    больше строк с каждой стороны границы, может дать другой результат.
+    """
+    
+    TITLE_HEAD = 1000  # символов начала текста для поиска названия (окно 300 + цена)
+    TITLE_TAIL = 500   # символов конца текста (как в _clean_title)
+    BOUNDARY_LINES = 3  # строк с каждой стороны границы частей для поиска полей в стыке
+    
+    def __init__(self, parser: CarDescriptionParser):
+        self._parser = parser
+        self._fields: Dict[str, tuple] = {}
+        self._spec_items = SpecDeduplicator()
+        self._seen = set()
+        self._title: Optional[str] = None  # «марка модель» по словарю
+        self._head = ""
+        self._tail = ""
+        self._carry = ""  # последние строки прошлой части
+        self._volume: Dict[int, Optional[float]] = {}  # первое совпадение каждого шаблона объёма
+        self._color_label: Optional[bool] = None  # первая метка «Цвет:» — цвет из списка?
+        self.chunks = 0
+        self.length = 0
+    
+    def feed(self, text: str) -> None:
+        """Разбирает очередную часть и сливает результат с предыдущими"""
+        text = text.strip()
+        if not text:
+            return
+        if PARSER_MAX_INPUT and self.length >= PARSER_MAX_INPUT:
+            logger.warning(f"Parser input truncated: part {self.chunks + 1} dropped after {self.length} chars")
+            return
+        deadline = self._parser._deadline()
+        text = self._parser._limit_input(text)
+        self.chunks += 1
+        self.length += len(text)
+        
+        lines = text.split('\n')
+        if self._carry:
+            # Стык идёт раньше остальной новой части: при равном ранге он и должен победить
+            self._merge_fields(self._carry + '\n' + '\n'.join(lines[:self.BOUNDARY_LINES]))
+        self._carry = '\n'.join(lines[-self.BOUNDARY_LINES:])
+        
+        text_lower = self._merge_fields(text)
+        
+        for item in self._parser._scan_spec_items(text, text_lower, deadline):
+            normalized = item.lower().replace(' ', '').replace(':', '')
+            if normalized not in self._seen:
+                self._seen.add(normalized)
+                self._spec_items.add(item)
+        
+        # «Марка модель» уже найдена в одной из прошлых частей — дальше не ищем
+        if self._title is None:
+            found = car_models.find(text, make_only=False)
+            if found:
+                self._title = found[1]
+        
+        if len(self._head) < self.TITLE_HEAD:
+            self._head = (self._head + "\n" + text if self._head else text)[:self.TITLE_HEAD]
+        self._tail = (self._tail + "\n" + text)[-self.TITLE_TAIL:]
+    
+    def _merge_fields(self, text: str) -> str:
+        """Сливает поля текста с уже найденными по рангу; возвращает нижний регистр текста"""
+        parser = self._parser
+        text_lower = parser._lower(text)
+        for rank, value in parser._volume_stages(text_lower, every=True).items():
+            self._volume.setdefault(rank, value)
+        if self._color_label is None:
+            match = parser._COLOR_LABEL.search(text_lower)
+            if match:
+                self._color_label = match.group(1).lower() in parser.colors
+        
+        for name, (rank, value) in parser._rank_fields(text, text_lower).items():
+            if name == 'volume':
+                continue
+            if name == 'color' and rank == 0 and not self._color_label:
+                # Первая метка в тексте — не цвет: дальше цвет ищется только словами
+                color = parser._color_word(text, text_lower)
+                if color is None:
+                    continue
+                rank, value = color
+            current = self._fields.get(name)
+            if current is None or rank < current[0]:
+                self._fields[name] = (rank, value)
+            elif name == 'mileage_km' and rank == current[0] == 1:
+                # Пробег без метки — наибольшее «число км» во всём тексте
+                self._fields[name] = (1, max(current[1], value))
+        return text_lower
+    
+    def result(self) -> Dict:
+        """Текущий разбор всех частей (формат как у parse)"""
+        value = {
+            name: self._fields[name][1] if name in self._fields else None
+            for name in CarDescriptionParser.RANKED_FIELDS
         }
+        volume = self._parser._pick_volume(self._volume)
+        value['volume'] = volume[1] if volume else None
+        engine_short = self._parser._format_engine(value['power'], value['volume'], value['fuel'])
+        title = self._title
+        if title is None:
+            head = self._parser._TITLE_PRICE.sub('', self._head)
+            # Короткий текст целиком в _head: конец берётся после удаления цены, как в _clean_title
+            tail = head[-self.TITLE_TAIL:] if len(self._head) < self.TITLE_HEAD else self._tail[-self.TITLE_TAIL:]
+            title = (
+                self._parser._title_from_head(head)
+                or self._parser._title_from_tail(tail)
+                or self._parser._title_from_make(head)
+            )
+        return {
+            'title': title,
+            'year': value['year'],
+            'drive': value['drive'],
+            'engine_short': engine_short,
+            'engine_full': engine_short,
+            'gearbox': value['gearbox'],
+            'color': value['color'],
+            'mileage_km': value['mileage_km'],
+            'spec_items': self._spec_items.items(),
+        }
+
+
+# Общий парсер процесса. Разбор не меняет состояние экземпляра, а шаблоны —
+# неизменяемые объекты класса: экземпляр можно делить между потоками,
+# дочерние процессы (fork) получают его готовым, без блокировок и перекомпиляции
+car_parser = CarDescriptionParser()
@@ -12,6 +12,14 @@ PDF генератор КП (премиум-шаблон, стабильная 
 Зависимости:
   pip install reportlab pillow
 
+Шрифты (кириллица) — FreeSans / FreeSansBold, ищутся один раз на процесс (font_manager):
+  PDF_FONT_DIR → fonts/ рядом с модулем → системный freefont (apt: fonts-freefont-ttf)
+  → /tmp/fonts; скачиваются, только если нигде не найдены. Пока шрифтов нет,
+  PDF собирается на Helvetica, а поиск повторяется при следующем PDF.
+  Настройки (переменные окружения):
+  - PDF_FONT_DIR      — каталог с FreeSans.ttf и FreeSansBold.ttf
+  - PDF_FONT_DOWNLOAD — 0, чтобы не скачивать шрифты (без них — Helvetica без кириллицы)
+
 Как использовать:
   from pdf_generator import generate_kp_pdf
   pdf_path = generate_kp_pdf(car_data, photo_paths)
@@ -24,6 +32,8 @@ PDF генератор КП (премиум-шаблон, стабильная 
 
 import os
 import io
+import time
+import threading
 import urllib.request
 from datetime import datetime
 from typing import List, Optional, Tuple
@@ -43,27 +53,99 @@ from PIL import Image, ImageOps, ImageDraw
 # Fonts
 # -----------------------------
 
-def download_fonts() -> str:
+FONT_FILES = {"FreeSans": "FreeSans.ttf", "FreeSansBold": "FreeSansBold.ttf"}
+FONT_URLS = {
+    "FreeSans.ttf": "https://github.com/opensourcedesign/fonts/raw/master/gnu-freefont_freesans/FreeSans.ttf",
+    "FreeSansBold.ttf": "https://github.com/opensourcedesign/fonts/raw/master/gnu-freefont_freesans/FreeSansBold.ttf",
+}
+FONT_DOWNLOAD_DIR = "/tmp/fonts"
+FONT_DIRS = [
+    os.getenv("PDF_FONT_DIR", ""),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts"),
+    "/usr/share/fonts/truetype/freefont",
+    "/usr/share/fonts/gnu-free",
+    FONT_DOWNLOAD_DIR,
+]
+PDF_FONT_DOWNLOAD = os.getenv("PDF_FONT_DOWNLOAD", "1") != "0"
+FONT_DOWNLOAD_RETRY = 300  # сек между попытками скачать шрифты после неудачи
+FALLBACK_FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+def download_fonts(font_dir: str = FONT_DOWNLOAD_DIR, timeout: float = 10) -> str:
     """Скачивает FreeSans шрифты (кириллица) если их нет."""
-    font_dir = "/tmp/fonts"
     os.makedirs(font_dir, exist_ok=True)
 
-    fonts = {
-        "FreeSans.ttf": "https://github.com/opensourcedesign/fonts/raw/master/gnu-freefont_freesans/FreeSans.ttf",
-        "FreeSansBold.ttf": "https://github.com/opensourcedesign/fonts/raw/master/gnu-freefont_freesans/FreeSansBold.ttf",
-    }
-
-    for filename, url in fonts.items():
+    for filename, url in FONT_URLS.items():
         filepath = os.path.join(font_dir, filename)
         if not os.path.exists(filepath):
             try:
-                urllib.request.urlretrieve(url, filepath)
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    data = response.read()
+                with open(filepath, "wb") as f:
+                    f.write(data)
             except Exception as e:
                 print(f"Failed to download {filename}: {e}")
 
     return font_dir
 
 
+class FontManager:
+    """
+    Шрифты PDF: поиск, разбор TTF и регистрация в reportlab — один раз на процесс.
+    Разобранные TTFont остаются в реестре pdfmetrics, каждый генератор берёт
+    только имена шрифтов.
+    """
+
+    def __init__(self, font_dirs: Optional[List[str]] = None, download: bool = PDF_FONT_DOWNLOAD):
+        self.font_dirs = [d for d in (font_dirs if font_dirs is not None else FONT_DIRS) if d]
+        self.download = download
+        self._names: Optional[Tuple[str, str]] = None
+        self._download_at = 0.0  # time.monotonic() последней попытки скачивания
+        self._lock = threading.Lock()
+
+    def _find_dir(self) -> Optional[str]:
+        for font_dir in self.font_dirs:
+            if all(os.path.exists(os.path.join(font_dir, f)) for f in FONT_FILES.values()):
+                return font_dir
+        return None
+
+    def _load(self) -> Optional[Tuple[str, str]]:
+        """FreeSans из первого каталога, где он есть (или скачанный); None — не удалось"""
+        font_dir = self._find_dir()
+        # Скачивание медленное: после неудачи — не чаще раза в FONT_DOWNLOAD_RETRY
+        if font_dir is None and self.download and time.monotonic() - self._download_at >= FONT_DOWNLOAD_RETRY:
+            self._download_at = time.monotonic()
+            font_dir = download_fonts()
+        try:
+            if font_dir is None:
+                raise FileNotFoundError(f"FreeSans not found in {self.font_dirs}")
+            for name, filename in FONT_FILES.items():
+                pdfmetrics.registerFont(TTFont(name, os.path.join(font_dir, filename)))
+            print(f"✅ Using FreeSans fonts from {font_dir}")
+            return "FreeSans", "FreeSansBold"
+        except Exception as e:
+            print(f"⚠️ Failed to load FreeSans: {e}")
+            print("⚠️ Using Helvetica (no Cyrillic support)")
+            return None
+
+    def fonts(self) -> Tuple[str, str]:
+        """
+        (обычный, жирный) — имена зарегистрированных шрифтов.
+        Запомнен только удачный результат: без FreeSans этот PDF — на Helvetica,
+        а следующий вызов ищет шрифты снова (могли появиться в каталоге).
+        """
+        if self._names is None:
+            with self._lock:
+                if self._names is None:
+                    self._names = self._load()
+                    if self._names is None:
+                        return FALLBACK_FONTS
+        return self._names
+
+
+font_manager = FontManager()
+
+
 # -----------------------------
 # Generator
 # -----------------------------
@@ -85,18 +167,7 @@ class KPPDFGenerator:
         self.page_num = 1
         self.price_drawn_on_first_page = False
 
-        font_dir = download_fonts()
-        try:
-            pdfmetrics.registerFont(TTFont("FreeSans", os.path.join(font_dir, "FreeSans.ttf")))
-            pdfmetrics.registerFont(TTFont("FreeSansBold", os.path.join(font_dir, "FreeSansBold.ttf")))
-            self.font = "FreeSans"
-            self.font_bold = "FreeSansBold"
-            print("✅ Using FreeSans fonts")
-        except Exception as e:
-            print(f"⚠️ Failed to load FreeSans: {e}")
-            self.font = "Helvetica"
-            self.font_bold = "Helvetica-Bold"
-            print("⚠️ Using Helvetica (no Cyrillic support)")
+        self.font, self.font_bold = font_manager.fonts()
 
         # palette
         self.c_title = colors.HexColor("#0f172a")
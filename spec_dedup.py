@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Нечёткие дубли в спецификации.
+Соседние скриншоты альбома перекрываются, и одна строка характеристик
+распознаётся дважды с разницей в один-два символа ("Крутящий момент" /
+"Крутяший момент"). Точная проверка дублей в парсере их не ловит.
+
+- Пункт → биграммы символов (регистр и буквы-двойники OCR свёрнуты, см. car_models.fold)
+- MinHash-подпись по биграммам, подпись режется на полосы (LSH): кандидаты
+  в дубли — пункты с теми же числами, длиной в пределах SPEC_DEDUP_MAX_EDITS
+  и совпавшей полосой. Подпись считается, только когда такие пункты есть:
+  в одном объявлении их обычно нет, и MinHash не нужен вовсе
+- Кандидат проверяется точно: одинаковые числа ("Количество мест 5" и
+  "Количество мест 7" — разные пункты), не больше SPEC_DEDUP_MAX_EDITS правок
+  на всю строку, и каждое несовпавшее слово — опечатка OCR (одна правка в слове
+  от 4 букв), а не другое слово ("Передняя" / "Задняя", "левый" / "правый",
+  "AT" / "MT")
+- Из группы дублей остаётся лучший вариант (без смеси латиницы и кириллицы
+  в слове и мусорных символов, затем самый полный) на месте первого
+
+Настройки (переменные окружения):
+- SPEC_DEDUP_THRESHOLD — сходство строк (1 − правки / длина), начиная с которого
+  пункты считаются дублями (0 — отключить)
+- SPEC_DEDUP_MAX_EDITS — максимум правок между дублями, независимо от длины строки
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import random
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from car_models import fold
+
+SPEC_DEDUP_THRESHOLD = float(os.getenv("SPEC_DEDUP_THRESHOLD", "0.9"))
+SPEC_DEDUP_MAX_EDITS = int(os.getenv("SPEC_DEDUP_MAX_EDITS", "2"))
+OCR_TYPO_MIN_WORD = 4  # в словах короче одна правка — уже другое слово ("AT" / "MT")
+
+# Подпись 30 хэшей = 10 полос по 3: пункты с общими биграммами от ~50%
+# почти всегда попадают в общую корзину хотя бы одной полосы
+LSH_BANDS = 10
+LSH_ROWS = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240517)  # подпись одинакова во всех процессах
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(LSH_BANDS * LSH_ROWS)
+]
+
+_NUMBER = re.compile(r'\d+')
+_WORD = re.compile(r'\w+')
+_MIXED_WORD = re.compile(r'\b(?=\w*[a-zA-Z])(?=\w*[а-яА-ЯёЁ])\w+')
+_ODD_CHAR = re.compile(r'[|_~^\\{}\[\]<>«»@#$]')
+
+
+def spec_key(item: str) -> str:
+    """Строка для сравнения: без регистра, пробелов, двоеточий, двойники свёрнуты"""
+    return fold(item).replace(' ', '').replace(':', '')
+
+
+# Биграмма → её значения во всех перестановках. Биграмм в текстах объявлений
+# немного, поэтому подпись пункта — поэлементный минимум готовых строк
+_SHINGLE_CACHE: Dict[str, Tuple[int, ...]] = {}
+_SHINGLE_CACHE_SIZE = 1 << 16
+
+
+def _shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    hashes = _SHINGLE_CACHE.get(shingle)
+    if hashes is None:
+        h = zlib.crc32(shingle.encode('utf-8'))
+        hashes = tuple((a * h + b) % _PRIME for a, b in _PERMUTATIONS)
+        if len(_SHINGLE_CACHE) >= _SHINGLE_CACHE_SIZE:
+            _SHINGLE_CACHE.clear()
+        _SHINGLE_CACHE[shingle] = hashes
+    return hashes
+
+
+def minhash(key: str) -> List[int]:
+    """MinHash-подпись множества биграмм строки"""
+    shingles = {key[i:i + 2] for i in range(max(1, len(key) - 1))}
+    return list(map(min, zip(*map(_shingle_hashes, shingles))))
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Левенштейна; больше limit — возвращается limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def ocr_typos_only(a: str, b: str) -> bool:
+    """
+    Слова строк различаются только опечатками OCR: попарно одна правка в слове
+    от OCR_TYPO_MIN_WORD букв. Если OCR склеил или разбил слова (число слов
+    разное), попарно сравнить нельзя — решает только число правок строки.
+    """
+    words_a = _WORD.findall(fold(a))
+    words_b = _WORD.findall(fold(b))
+    if len(words_a) != len(words_b):
+        return True
+    for word_a, word_b in zip(words_a, words_b):
+        if word_a == word_b:
+            continue
+        if min(len(word_a), len(word_b)) < OCR_TYPO_MIN_WORD or edit_distance(word_a, word_b, 1) > 1:
+            return False
+    return True
+
+
+def quality(item: str) -> Tuple[int, int]:
+    """Чем больше, тем лучше вариант: меньше следов OCR-ошибок, затем длиннее"""
+    noise = len(_MIXED_WORD.findall(item)) + len(_ODD_CHAR.findall(item))
+    return -noise, len(item)
+
+
+class SpecDeduplicator:
+    """Инкрементальная группировка пунктов: add() по одному, items() — итог по порядку"""
+
+    def __init__(self, threshold: float = SPEC_DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.enabled = threshold > 0
+        self._best: List[str] = []                    # лучший вариант группы
+        self._keys: List[Tuple[str, List[str], int, str]] = []  # (ключ, числа, группа, пункт)
+        self._exact: Dict[str, int] = {}              # ключ → группа
+        self._shapes: Dict[Tuple[Tuple[str, ...], int], List[int]] = {}  # (числа, длина ключа) → пункты
+        self._bands: List[Optional[List[Tuple[int, ...]]]] = []  # полосы подписи, считаются по требованию
+
+    def _similar(self, item: str, key: str, numbers: List[str], other: Tuple[str, List[str], int, str]) -> bool:
+        other_key, other_numbers, _, other_item = other
+        if numbers != other_numbers:
+            return False
+        limit = min(SPEC_DEDUP_MAX_EDITS, int((1 - self.threshold) * max(len(key), len(other_key))))
+        return edit_distance(key, other_key, limit) <= limit and ocr_typos_only(item, other_item)
+
+    def _signature_bands(self, index: int, key: str) -> List[Tuple[int, ...]]:
+        """Полосы MinHash-подписи пункта (LSH); считаются один раз"""
+        bands = self._bands[index]
+        if bands is None:
+            signature = minhash(key)
+            bands = [tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]) for band in range(LSH_BANDS)]
+            self._bands[index] = bands
+        return bands
+
+    def add(self, item: str) -> bool:
+        """Добавляет пункт; True — новая группа, False — дубль уже добавленного"""
+        if not self.enabled:
+            self._best.append(item)
+            return True
+
+        key = spec_key(item)
+        group = self._exact.get(key)
+        if group is None:
+            numbers = _NUMBER.findall(item)
+            shape = tuple(numbers)
+            # Дублем может быть только пункт с теми же числами и близкой длиной ключа
+            # (_similar: числа равны, правок не больше SPEC_DEDUP_MAX_EDITS)
+            candidates = sorted(
+                i
+                for length in range(len(key) - SPEC_DEDUP_MAX_EDITS, len(key) + SPEC_DEDUP_MAX_EDITS + 1)
+                for i in self._shapes.get((shape, length), ())
+            )
+            index = len(self._keys)
+            self._bands.append(None)
+            if candidates:
+                bands = self._signature_bands(index, key)
+                for i in candidates:
+                    other_bands = self._signature_bands(i, self._keys[i][0])
+                    if any(map(tuple.__eq__, bands, other_bands)) and self._similar(item, key, numbers, self._keys[i]):
+                        group = self._keys[i][2]
+                        break
+            self._shapes.setdefault((shape, len(key)), []).append(index)
+            self._keys.append((key, numbers, len(self._best) if group is None else group, item))
+            self._exact[key] = self._keys[-1][2]
+
+        if group is None:
+            self._best.append(item)
+            return True
+        if quality(item) > quality(self._best[group]):
+            self._best[group] = item
+        return False
+
+    def items(self) -> List[str]:
+        return list(self._best)
+
+
+def dedup_spec_items(items: Iterable[str], threshold: float = SPEC_DEDUP_THRESHOLD) -> List[str]:
+    """Пункты без нечётких дублей (порядок — по первому варианту каждой группы)"""
+    dedup = SpecDeduplicator(threshold)
+    for item in items:
+        dedup.add(item)
+    return dedup.items()
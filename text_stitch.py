@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Склейка текстов соседних скриншотов с прокруткой.
+Нижние строки одного скриншота повторяются в начале следующего: без склейки
+они разбираются дважды (лишние пункты спецификации, название «с конца» —
+из повтора).
+
+- Строка сравнивается по ключу: только буквы и цифры, регистр и буквы-двойники
+  OCR свёрнуты (см. car_models.fold)
+- Перекрытие — самый длинный конец предыдущего текста, совпадающий с началом
+  следующего, по строкам. Ищется полиномиальными хэшами строк: конец и начало
+  наращиваются по одной строке, сравнение — O(1) на длину, совпадение хэшей
+  проверяется по самим строкам
+- У края экрана строка часто обрезана или это панель приложения: до
+  STITCH_EDGE_LINES строк в конце предыдущего и в начале следующего текста
+  могут не участвовать в перекрытии (и отбрасываются при склейке)
+- Тексты без перекрытия разделяются пустой строкой, как раньше
+
+Настройки (переменные окружения):
+- STITCH_EDGE_LINES        — сколько строк у края экрана можно пропустить
+- STITCH_MIN_OVERLAP_LINES — минимум совпавших строк, чтобы считать тексты перекрытыми
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+from car_models import fold
+
+logger = logging.getLogger(__name__)
+
+STITCH_EDGE_LINES = int(os.getenv("STITCH_EDGE_LINES", "2"))
+STITCH_MIN_OVERLAP_LINES = int(os.getenv("STITCH_MIN_OVERLAP_LINES", "2"))
+
+_MOD = (1 << 61) - 1
+_BASE = 1_000_003
+
+
+def line_key(line: str) -> str:
+    """Ключ строки для сравнения: только буквы и цифры, двойники свёрнуты"""
+    return "".join(ch for ch in fold(line) if ch.isalnum())
+
+
+def _overlap_at(prev: List[int], prev_keys: List[str], end: int,
+                next_: List[int], next_keys: List[str], start: int) -> int:
+    """
+    Самая длинная общая часть: prev[end-k:end] == next_[start:start+k].
+    Хэш конца prev и начала next_ наращиваются на строку за шаг.
+    """
+    best = 0
+    head = tail = 0
+    power = 1
+    for k in range(1, min(end, len(next_) - start) + 1):
+        head = (head * _BASE + next_[start + k - 1]) % _MOD
+        tail = (prev[end - k] * power + tail) % _MOD
+        power = power * _BASE % _MOD
+        if head == tail and prev_keys[end - k:end] == next_keys[start:start + k]:
+            best = k
+    return best
+
+
+def find_overlap(prev_keys: List[str], next_keys: List[str], edge_lines: int = STITCH_EDGE_LINES,
+                 min_overlap: int = STITCH_MIN_OVERLAP_LINES) -> Optional[Tuple[int, int, int]]:
+    """
+    Перекрытие двух текстов по ключам строк: (drop_tail, drop_head, length) или None.
+    prev_keys[-drop_tail-length:-drop_tail] == next_keys[drop_head:drop_head+length];
+    из вариантов — самое длинное перекрытие, при равной длине — с меньшим пропуском.
+    """
+    # Перекрытие не длиннее следующего текста: хвост предыдущего — той же длины
+    prev_keys = prev_keys[-(len(next_keys) + edge_lines):]
+    prev = [hash(key) % _MOD for key in prev_keys]
+    next_ = [hash(key) % _MOD for key in next_keys]
+    best = None
+    for drop_tail in range(min(edge_lines, len(prev_keys)) + 1):
+        for drop_head in range(min(edge_lines, len(next_keys)) + 1):
+            length = _overlap_at(prev, prev_keys, len(prev_keys) - drop_tail, next_, next_keys, drop_head)
+            if length < max(1, min_overlap):
+                continue
+            if best is None or (length, -(drop_tail + drop_head)) > (best[2], -(best[0] + best[1])):
+                best = (drop_tail, drop_head, length)
+    return best
+
+
+def stitch_texts(texts: List[str], edge_lines: int = STITCH_EDGE_LINES,
+                 min_overlap: int = STITCH_MIN_OVERLAP_LINES, separator: str = "\n\n") -> str:
+    """
+    Один документ из текстов по порядку: перекрытие соседних текстов остаётся
+    один раз, тексты без перекрытия соединяются через separator.
+    """
+    blocks: List[List[str]] = []
+    keys: List[str] = []  # ключи строк последнего блока
+    for text in texts:
+        lines = [line for line in text.split("\n") if line.strip()]
+        if not lines:
+            continue
+        line_keys = [line_key(line) for line in lines]
+        overlap = find_overlap(keys, line_keys, edge_lines, min_overlap) if keys else None
+        if overlap is None:
+            blocks.append(lines)
+            keys = line_keys
+            continue
+        drop_tail, drop_head, length = overlap
+        logger.debug(f"Stitched texts: {length} overlapping lines, {drop_tail}+{drop_head} edge lines dropped")
+        block = blocks[-1]
+        if drop_tail:
+            del block[-drop_tail:]
+            del keys[-drop_tail:]
+        block.extend(lines[drop_head + length:])
+        keys.extend(line_keys[drop_head + length:])
+    return separator.join("\n".join(block) for block in blocks)